@@ -0,0 +1,78 @@
+from indexes import split_list
+
+# --- Aggregation ---
+# aggregateMovies counts the filtered movies and computes count/sum/avg/min/max
+# of numeric fields, either over all of them or per Year, Genre or Director. A
+# movie with several genres counts towards each of them; movies without a value
+# for the group field form the null group. Null field values are left out of
+# that field's statistics.
+#
+# Engines produce {group key: (movies, [(values, sum, min, max) per field])},
+# and aggregate_rows turns that into the GraphQL AggregateRow list.
+
+GROUP_FIELDS = ("Year", "Genre", "Director")
+METRIC_FIELDS = ("Rating", "Runtime", "Votes", "Revenue")
+
+
+def group_keys(movie, groupBy):
+    value = movie.get(groupBy)
+    if value is None or value == "":
+        return [None]
+    if groupBy == "Genre":
+        return [genre for genre in split_list(value) if genre] or [None]
+    return [value]
+
+
+def accumulate(movies, groupBy=None, fields=()):
+    """One pass over `movies`, returning the groups described above."""
+    # Bucket the rows first; the per-field statistics are then built-in
+    # sum/min/max calls over each group's values.
+    if groupBy == "Genre":
+        buckets = {}
+        for movie in movies:
+            for key in group_keys(movie, groupBy):
+                buckets.setdefault(key, []).append(movie)
+    elif groupBy:
+        buckets = {}
+        for movie in movies:
+            key = movie.get(groupBy)
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = []
+            bucket.append(movie)
+        if "" in buckets:
+            buckets.setdefault(None, []).extend(buckets.pop(""))
+    else:
+        buckets = {None: list(movies)}
+    groups = {}
+    for key, bucket in buckets.items():
+        stats = []
+        for field in fields:
+            values = [value for value in (movie.get(field) for movie in bucket) if value is not None]
+            stats.append((len(values), sum(values), min(values), max(values)) if values else (0, 0, None, None))
+        groups[key] = (len(bucket), stats)
+    return groups
+
+
+def _group_order(key):
+    # Years numerically, names alphabetically, the null group last
+    return (key is None, key.casefold() if isinstance(key, str) else key or 0)
+
+
+def aggregate_rows(groups, groupBy=None, fields=()):
+    """AggregateRow dicts, ordered by group. Without groupBy there is always exactly one row."""
+    if not groupBy and not groups:
+        groups = {None: (0, [(0, 0, None, None) for _ in fields])}
+    rows = []
+    for key in sorted(groups, key=_group_order):
+        count, stats = groups[key]
+        metrics = [{
+            "field": field,
+            "count": int(n),
+            "sum": float(total) if n else None,
+            "avg": total / n if n else None,
+            "min": float(low) if n else None,
+            "max": float(high) if n else None,
+        } for field, (n, total, low, high) in zip(fields, stats)]
+        rows.append({"group": None if key is None else str(key), "count": int(count), "metrics": metrics})
+    return rows
@@ -1,14 +1,69 @@
+import atexit
 import json
 import os
-from flask import Flask, request, jsonify
-from ariadne import gql, QueryType, MutationType, make_executable_schema, graphql_sync
+import queue
+import time
+from contextlib import contextmanager
+from flask import Flask, Response, g, request, jsonify, stream_with_context
+from ariadne import gql, QueryType, MutationType, make_executable_schema
 from ariadne.explorer import ExplorerGraphiQL
 import requests
+from store import MovieStore
+from storage import MemoryStorage
+from journal import Journal
+from snapshot import MovieSnapshot, latest_snapshot, remove_old_snapshots, write_snapshot_generation
+from query_cache import TranslationCache
+from intents import parse_intent
+from document_cache import DocumentCache
+from prompt import build_system_prompt, chat_messages
+from result_cache import ResultCache, aggregate_key, list_key
+from bulk import BulkImport, upload_format
+from titles import MATCH_MIN_SCORE
+from metrics import (CHATBOT_REQUESTS, CONTENT_TYPE, HTTP_SECONDS, LLM_ERRORS, REGISTRY, WRITE_BYTES, ResolverTiming,
+                     cache_collector, end_trace, server_timing, span, start_trace, trace_spans)
+from profiler import SamplingProfiler
 
 # --- Initial Setup ---
 app = Flask(__name__)
 DATA_FILE = "imdb.json"
-OLLAMA_API_URL = "http://127.0.0.1:11434/api/chat"
+# "binary" loads from and compacts into BINARY_DATA_FILE, a memory-mapped columnar
+# snapshot (see snapshot.py) that opens without parsing every row. Compaction
+# writes numbered generations next to it (imdb.bin.1, ...); the newest is loaded.
+SNAPSHOT_FORMAT = os.environ.get("MOVIEBOT_SNAPSHOT_FORMAT", "json")
+BINARY_DATA_FILE = "imdb.bin"
+OLLAMA_API_URL = os.environ.get("MOVIEBOT_OLLAMA_URL", "http://127.0.0.1:11434/api/chat")
+OLLAMA_MODEL = "qwen2.5:1.5b"
+OLLAMA_TIMEOUT = float(os.environ.get("MOVIEBOT_OLLAMA_TIMEOUT", "120"))  # seconds per LLM call
+# How long Ollama keeps the model (and the evaluated system prompt) loaded between calls
+OLLAMA_KEEP_ALIVE = os.environ.get("MOVIEBOT_OLLAMA_KEEP_ALIVE", "30m")
+# 0 = every few-shot example sits in the cached system prompt; N = send only the N
+# examples most similar to the request (fewer tokens, but evaluated on every call)
+PROMPT_EXAMPLES = int(os.environ.get("MOVIEBOT_PROMPT_EXAMPLES", "0"))
+# "index" answers listMovies from the store's indexes; "columnar" uses the NumPy engine
+# in columnar.py, which is faster for whole-catalog sorts (e.g. by Votes or Revenue).
+QUERY_ENGINE = os.environ.get("MOVIEBOT_QUERY_ENGINE", "index")
+# "memory" serves from the in-memory store; "sqlite" keeps the catalog in SQLITE_FILE
+# (seeded from DATA_FILE on first run) so several worker processes can share it.
+STORAGE_BACKEND = os.environ.get("MOVIEBOT_STORAGE", "memory")
+SQLITE_FILE = "imdb.db"
+# Mutations are appended to JOURNAL_FILE and folded into the snapshot by a background compaction.
+JOURNAL_FILE = (BINARY_DATA_FILE if SNAPSHOT_FORMAT == "binary" else DATA_FILE) + ".journal"
+JOURNAL_FSYNC_EVERY = int(os.environ.get("MOVIEBOT_JOURNAL_FSYNC_EVERY", "1"))  # 0 = never fsync explicitly
+JOURNAL_COMPACT_SECONDS = float(os.environ.get("MOVIEBOT_JOURNAL_COMPACT_SECONDS", "30"))
+# Chatbot questions -> generated GraphQL; set MOVIEBOT_TRANSLATION_CACHE_FILE to keep it across restarts.
+TRANSLATION_CACHE_SIZE = int(os.environ.get("MOVIEBOT_TRANSLATION_CACHE_SIZE", "1024"))
+TRANSLATION_CACHE_TTL = float(os.environ.get("MOVIEBOT_TRANSLATION_CACHE_TTL", str(24 * 60 * 60)))
+TRANSLATION_CACHE_FILE = os.environ.get("MOVIEBOT_TRANSLATION_CACHE_FILE")
+# Parsed and validated GraphQL documents, keyed by query hash (also serves persisted queries).
+DOCUMENT_CACHE_SIZE = int(os.environ.get("MOVIEBOT_DOCUMENT_CACHE_SIZE", "512"))
+# listMovies/getMovie results, dropped whenever the catalog changes
+RESULT_CACHE_MB = float(os.environ.get("MOVIEBOT_RESULT_CACHE_MB", "64"))
+# Rows per transaction in POST /movies/import
+IMPORT_BATCH_SIZE = int(os.environ.get("MOVIEBOT_IMPORT_BATCH_SIZE", "1000"))
+# Time every Query/Mutation resolver (moviebot_resolver_seconds on /metrics)
+RESOLVER_TIMING = os.environ.get("MOVIEBOT_RESOLVER_TIMING", "1") == "1"
+# Serve /debug/profiler, which starts and stops the sampling profiler at runtime
+PROFILER_ENDPOINT = os.environ.get("MOVIEBOT_PROFILER_ENDPOINT", "0") == "1"
 
 # --- Data Handling Functions ---
 def load_movies_from_db():
@@ -17,12 +72,47 @@ def load_movies_from_db():
     with open(DATA_FILE, 'r') as f:
         return json.load(f)
 
-def save_movies_to_db(movies):
-    with open(DATA_FILE, 'w') as f:
-        json.dump(movies, f, indent=4)
+def load_movie_store():
+    snapshot_file = latest_snapshot(BINARY_DATA_FILE) if SNAPSHOT_FORMAT == "binary" else None
+    if snapshot_file:
+        # Generations a previous run couldn't delete while it had them mapped
+        remove_old_snapshots(BINARY_DATA_FILE, keep=snapshot_file)
+        return MovieStore.from_snapshot(MovieSnapshot(snapshot_file))
+    return MovieStore(load_movies_from_db())
 
-movies_db = load_movies_from_db()
-print(f"Loaded {len(movies_db)} movies from {DATA_FILE}")
+def save_movies_to_db(movies):
+    with span("snapshot_write"):
+        if SNAPSHOT_FORMAT == "binary":
+            snapshot_file = write_snapshot_generation(BINARY_DATA_FILE, movies)
+            WRITE_BYTES.inc(os.path.getsize(snapshot_file), target="snapshot")
+            return
+        # Write to a temp file and rename so a crash never leaves a half-written snapshot.
+        tmp_file = DATA_FILE + ".tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(movies, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+            WRITE_BYTES.inc(f.tell(), target="snapshot")
+        os.replace(tmp_file, DATA_FILE)
+
+def snapshot_rows():
+    # The published store is never modified in place, so no lock is needed to read it
+    return [dict(m) for m in storage.store]
+
+if STORAGE_BACKEND == "sqlite":
+    from sqlite_storage import SQLiteStorage
+    storage = SQLiteStorage(SQLITE_FILE, initial_movies=load_movies_from_db)
+    print(f"Loaded {len(storage)} movies from {SQLITE_FILE}")
+else:
+    movies_db = load_movie_store()
+    journal = Journal(JOURNAL_FILE, save_movies_to_db, fsync_every=JOURNAL_FSYNC_EVERY)
+    replayed = journal.replay(movies_db)
+    print(f"Loaded {len(movies_db)} movies ({SNAPSHOT_FORMAT} snapshot, {replayed} journaled changes replayed)")
+    storage = MemoryStorage(movies_db, journal, QUERY_ENGINE)
+    if replayed:
+        journal.compact(snapshot_rows)
+    journal.start_background_compaction(snapshot_rows, interval=JOURNAL_COMPACT_SECONDS)
+    atexit.register(journal.close, snapshot_rows)
 
 # --- GraphQL Schema Definition (SDL) ---
 type_defs = gql("""
@@ -66,7 +156,7 @@ type_defs = gql("""
     }
 
     input MovieFilterInput {
-        titleContains: String!
+        titleContains: String
         minRating: Float
         minYear: Int
         maxYear: Int
@@ -78,11 +168,75 @@ type_defs = gql("""
         maxRuntime: Int
     }
 
+    input MovieChangeInput {
+        title: String!
+        input: UpdateMovieInput!
+    }
+
     type DeletePayload {
         success: Boolean!
         message: String
     }
 
+    type RowError {
+        index: Int!
+        title: String
+        message: String!
+    }
+
+    type BatchPayload {
+        movies: [Movie!]!
+        errors: [RowError!]!
+    }
+
+    type MovieMatch {
+        score: Float!
+        movie: Movie!
+    }
+
+    enum AggregateGroup {
+        Year
+        Genre
+        Director
+    }
+
+    enum AggregateField {
+        Rating
+        Runtime
+        Votes
+        Revenue
+    }
+
+    type FieldStats {
+        field: AggregateField!
+        count: Int!
+        sum: Float
+        avg: Float
+        min: Float
+        max: Float
+    }
+
+    type AggregateRow {
+        group: String
+        count: Int!
+        metrics: [FieldStats!]!
+    }
+
+    type MovieEdge {
+        cursor: String!
+        node: Movie!
+    }
+
+    type PageInfo {
+        hasNextPage: Boolean!
+        endCursor: String
+    }
+
+    type MovieConnection {
+        edges: [MovieEdge!]!
+        pageInfo: PageInfo!
+    }
+
     type Query {
         listMovies(
             filter: MovieFilterInput,
@@ -90,103 +244,133 @@ type_defs = gql("""
             sortBy: String,
             order: String
         ): [Movie!]
-        getMovie(title: String!): Movie
+        listMoviesConnection(
+            filter: MovieFilterInput,
+            sortBy: String,
+            order: String,
+            first: Int,
+            after: String
+        ): MovieConnection!
+        getMovie(title: String!, fuzzy: Boolean = false): Movie
+        searchMovies(query: String!, limit: Int = 10): [MovieMatch!]!
+        aggregateMovies(
+            filter: MovieFilterInput,
+            groupBy: AggregateGroup,
+            metrics: [AggregateField!]
+        ): [AggregateRow!]!
     }
 
     type Mutation {
         createMovie(input: MovieInput!): Movie
         updateMovie(title: String!, input: UpdateMovieInput!): Movie
         deleteMovie(title: String!): DeletePayload
+        createMovies(inputs: [MovieInput!]!): BatchPayload!
+        updateMovies(changes: [MovieChangeInput!]!): BatchPayload!
+        deleteMovies(titles: [String!]!): BatchPayload!
     }
 """)
 
 # --- Resolvers ---
 query = QueryType()
 mutation = MutationType()
+result_cache = ResultCache(int(RESULT_CACHE_MB * 2 ** 20))
+
+def filter_arg(filter):
+    """MovieFilterInput with its null fields dropped: an explicit null means "not set"."""
+    return {arg: value for arg, value in (filter or {}).items() if value is not None} or None
 
 @query.field("listMovies")
 def resolve_list_movies(_, info, filter=None, limit=None, sortBy=None, order="ASC"):
-    filtered_movies = movies_db
-
-    if filter:
-        if "titleContains" in filter:
-            term = filter["titleContains"].lower()
-            filtered_movies = [m for m in filtered_movies if m.get("Title") and m["Title"].lower() == term]
-        if "minRating" in filter:
-            filtered_movies = [m for m in filtered_movies if m.get("Rating") and m["Rating"] >= filter["minRating"]]
-        if "minYear" in filter:
-            filtered_movies = [m for m in filtered_movies if m.get("Year") and m["Year"] >= filter["minYear"]]
-        if "maxYear" in filter:
-            filtered_movies = [m for m in filtered_movies if m.get("Year") and m["Year"] <= filter["maxYear"]]
-        if "exactYear" in filter:
-            filtered_movies = [m for m in filtered_movies if m.get("Year") == filter["exactYear"]]
-        if "minRuntime" in filter:
-            filtered_movies = [m for m in filtered_movies if m.get("Runtime") and m["Runtime"] >= filter["minRuntime"]]
-        if "maxRuntime" in filter:
-            filtered_movies = [m for m in filtered_movies if m.get("Runtime") and m["Runtime"] <= filter["maxRuntime"]]
-        if "genreContains" in filter:
-            term = filter["genreContains"].lower()
-            filtered_movies = [m for m in filtered_movies if m.get("Genre") and term in m["Genre"].lower()]
-        if "directorContains" in filter:
-            term = filter["directorContains"].lower()
-            filtered_movies = [m for m in filtered_movies if m.get("Director") and term in m["Director"].lower()]
-        if "actorContains" in filter:
-            term = filter["actorContains"].lower()
-            filtered_movies = [m for m in filtered_movies if m.get("Actors") and term in m["Actors"].lower()]
-
-    # Sorting
-    if sortBy:
-        reverse = True if order and order.upper() == "DESC" else False
-        filtered_movies = sorted(filtered_movies, key=lambda m: m.get(sortBy) or 0, reverse=reverse)
-
-    # # Apply limit
-    # if limit:
-    #     return filtered_movies[:limit]
-    
+    filter = filter_arg(filter)
+    limit = limit if limit and limit > 0 else None
+    filtered_movies = result_cache.get_or_compute(
+        storage.version, list_key(filter, sortBy, order, limit),
+        lambda: storage.list_movies(filter, sortBy, order, limit))
+
     if not filtered_movies:
         return [{"Title": "No movies found", "Year": None, "Rating": None, "Runtime": None, "Description": "No movies matched your criteria", "Director": None, "Actors": None}]
 
     return filtered_movies
 
+@query.field("listMoviesConnection")
+def resolve_list_movies_connection(_, info, filter=None, sortBy=None, order="ASC", first=None, after=None):
+    filter = filter_arg(filter)
+    return storage.list_movies_page(filter, sortBy, order, first, after)
+
+def find_movie(title, fuzzy):
+    movie = storage.get_movie(title)
+    if movie is None and fuzzy:
+        # Misspelled titles: take the closest one if it is close enough
+        matches = storage.search_movies(title, 1, MATCH_MIN_SCORE)
+        movie = matches[0][1] if matches else None
+    return movie
+
 @query.field("getMovie")
-def resolve_get_movie(_, info, title):
-    movie = next((m for m in movies_db if m['Title'].lower() == title.lower()), None)
+def resolve_get_movie(_, info, title, fuzzy=False):
+    movie = result_cache.get_or_compute(storage.version, ("getMovie", title, fuzzy),
+                                        lambda: find_movie(title, fuzzy))
     if not movie:
         return {"Title": "No movie found", "Year": None, "Rating": None, "Runtime": None, "Description": f"No movie with title '{title}' was found", "Director": None, "Actors": None}
     return movie
 
+@query.field("searchMovies")
+def resolve_search_movies(_, info, query, limit=10):
+    limit = 10 if limit is None else max(0, min(limit, 100))
+    matches = result_cache.get_or_compute(storage.version, ("searchMovies", query, limit),
+                                          lambda: storage.search_movies(query, limit))
+    return [{"score": round(score, 4), "movie": movie} for score, movie in matches]
+
+@query.field("aggregateMovies")
+def resolve_aggregate_movies(_, info, filter=None, groupBy=None, metrics=None):
+    filter = filter_arg(filter)
+    fields = list(dict.fromkeys(metrics or ()))
+    return result_cache.get_or_compute(storage.version, aggregate_key(filter, groupBy, fields),
+                                       lambda: storage.aggregate_movies(filter, groupBy, fields))
+
 @mutation.field("createMovie")
 def resolve_create_movie(_, info, input):
-    if any(m['Title'].lower() == input['Title'].lower() for m in movies_db):
+    new_movie = storage.create_movie(input)
+    if new_movie is None:
         raise Exception(f"Movie with title '{input['Title']}' already exists.")
-    new_id = max([m['Ids'] for m in movies_db]) + 1 if movies_db else 1
-    new_movie = {**input, "Ids": new_id}
-    movies_db.append(new_movie)
-    save_movies_to_db(movies_db)
     return new_movie
 
 @mutation.field("updateMovie")
 def resolve_update_movie(_, info, title, input):
-    movie_to_update = next((m for m in movies_db if m['Title'].lower() == title.lower()), None)
+    movie_to_update = storage.update_movie(title, input)
     if not movie_to_update:
         raise Exception(f"Movie with title '{title}' not found.")
-    for key, value in input.items():
-        if value is not None:
-            movie_to_update[key] = value
-    save_movies_to_db(movies_db)
     return movie_to_update
 
 @mutation.field("deleteMovie")
 def resolve_delete_movie(_, info, title):
-    global movies_db
-    initial_count = len(movies_db)
-    movies_db = [m for m in movies_db if m['Title'].lower() != title.lower()]
-    if len(movies_db) < initial_count:
-        save_movies_to_db(movies_db)
+    if storage.delete_movie(title):
         return {"success": True, "message": f"Movie '{title}' was deleted successfully."}
     return {"success": False, "message": f"Movie '{title}' not found."}
 
+# Batch mutations apply every valid row in one transaction; rows that can't be
+# applied come back in `errors` (index = position in the argument list).
+def row_errors(titles, indexes, message):
+    return [{"index": i, "title": titles[i], "message": message.format(title=titles[i])} for i in indexes]
+
+@mutation.field("createMovies")
+def resolve_create_movies(_, info, inputs):
+    created, rejected = storage.create_movies(inputs)
+    titles = [movie["Title"] for movie in inputs]
+    return {"movies": created, "errors": row_errors(titles, rejected, "Movie with title '{title}' already exists.")}
+
+@mutation.field("updateMovies")
+def resolve_update_movies(_, info, changes):
+    updated, missing = storage.update_movies([(change["title"], change["input"]) for change in changes])
+    titles = [change["title"] for change in changes]
+    return {"movies": updated, "errors": row_errors(titles, missing, "Movie with title '{title}' not found.")}
+
+@mutation.field("deleteMovies")
+def resolve_delete_movies(_, info, titles):
+    deleted, missing = storage.delete_movies(titles)
+    return {"movies": deleted, "errors": row_errors(titles, missing, "Movie '{title}' not found.")}
+
 schema = make_executable_schema(type_defs, query, mutation)
+document_cache = DocumentCache(schema, DOCUMENT_CACHE_SIZE, [ResolverTiming] if RESOLVER_TIMING else None)
 explorer = ExplorerGraphiQL()
 
 @app.route("/graphql", methods=["GET"])
@@ -196,125 +380,278 @@ def graphql_playground():
 @app.route("/graphql", methods=["POST"])
 def graphql_server():
     data = request.get_json()
-    success, result = graphql_sync(schema, data, context_value=request, debug=app.debug)
+    success, result = document_cache.execute(data, context_value=request, debug=app.debug)
     status_code = 200 if success else 400
     return jsonify(result), status_code
 
+def graphql_cache_stats_json():
+    return {"documents": document_cache.stats(), "results": result_cache.stats()}
+
+@app.route("/graphql/cache", methods=["GET"])
+def graphql_cache_stats():
+    return jsonify(graphql_cache_stats_json())
+
+translation_cache = TranslationCache(TRANSLATION_CACHE_SIZE, TRANSLATION_CACHE_TTL, TRANSLATION_CACHE_FILE)
+
+SYSTEM_PROMPT = build_system_prompt(type_defs, include_examples=not PROMPT_EXAMPLES)
+
+def ollama_payload(user_query, stream=False):
+    with span("prompt"):
+        return {
+            "model": OLLAMA_MODEL,
+            "messages": chat_messages(SYSTEM_PROMPT, user_query, PROMPT_EXAMPLES),
+            "stream": stream,
+            "keep_alive": OLLAMA_KEEP_ALIVE,
+            "options": {"temperature": 0}
+        }
+
+def graphql_from_llm(content):
+    return content.strip().replace("```graphql", "").replace("```", "")
+
+def translate_locally(user_query):
+    """Return (source, GraphQL) from the rules or the translation cache, or ("llm", None)."""
+    # Common request shapes are translated by rules; repeated questions reuse the
+    # earlier translation. Either way the LLM is skipped entirely.
+    with span("intent_rules"):
+        intent = parse_intent(storage, user_query)
+    if intent:
+        source, graphql_query_str = "rules", intent[1]
+    else:
+        graphql_query_str = translation_cache.get(user_query)
+        source = "cache" if graphql_query_str is not None else "llm"
+    CHATBOT_REQUESTS.inc(source=source)
+    return source, graphql_query_str
+
+def remember_translation(user_query, graphql_query_str, source, success, result):
+    # Only remember translations that actually ran cleanly
+    if source == "llm" and success and not result.get("errors"):
+        translation_cache.put(user_query, graphql_query_str)
+
+def chatbot_response(user_query, graphql_query_str, source, success, result):
+    remember_translation(user_query, graphql_query_str, source, success, result)
+    return {
+        "llm_query": graphql_query_str,
+        "result": result,
+        "source": source,
+        "cached": source == "cache"
+    }
+
+# Keep-alive sessions for LLM calls (see asgi.py for the async client). A
+# requests.Session must not be used by two threads at once, and the threaded
+# server starts a thread per connection, so each call borrows an idle session
+# (or opens one) and hands it back afterwards. There are at most as many
+# sessions as there were concurrent LLM calls.
+_idle_ollama_sessions = queue.LifoQueue()
+
+@contextmanager
+def ollama_session():
+    try:
+        session = _idle_ollama_sessions.get_nowait()
+    except queue.Empty:
+        session = requests.Session()
+    try:
+        yield session
+    finally:
+        _idle_ollama_sessions.put(session)
+
+def llm_error_reason(e):
+    return "timeout" if isinstance(e, (requests.exceptions.Timeout, TimeoutError)) else "connection"
+
 @app.route('/chatbot', methods=['POST'])
 def chatbot():
     user_query = request.json.get("query")
     if not user_query:
         return jsonify({"error": "No query provided"}), 400
 
-    prompt = f"""
-    You are an expert AI that converts natural language text into GraphQL queries.
-    Based on the schema below, generate a GraphQL query or mutation that corresponds to the user's request.
-    You must ONLY return the GraphQL query or mutation, with no other text, explanation, or markdown.
-
-    --- SCHEMA ---
-    {type_defs}
-    --- END SCHEMA ---
-
-    Examples:
-    - User: "show me all movies"
-    - AI: query {{ listMovies {{ Ids Title Year }} }}
-
-    - User: "find movies with rating greater than 8.5"
-    - AI: query {{ listMovies(filter: {{minRating: 8.5}}) {{ Title Rating }} }}
-    
-    - User: "List 3 action movies"
-    - AI: query {{ listMovies(filter: {{genreContains: "Action"}}, limit: 3) {{ Title Genre }} }}
-
-    - User: "Show me movies released after 2020"
-    - AI: query {{ listMovies(filter: {{minYear: 2021}}) {{ Title Year }} }}
-
-    - User: "List movies from before the year 2000"
-    - AI: query {{ listMovies(filter: {{maxYear: 1999}}) {{ Title Year }} }}
-
-    - User: "tell me about the movie Prometheus"
-    - AI: query {{ getMovie(title: "Prometheus") {{ Title Year Rating Runtime Description Director Actors }} }}
-
-    - User: "delete the movie Suicide Squad"
-    - AI: mutation {{ deleteMovie(title: "Suicide Squad") {{ success message }} }}
-    
-    - User: "update the movie Aryaman with year 2025"
-    - AI: mutation {{ updateMovie(title: "Aryaman", input: {{ Year: 2025 }}) {{ Title Year }} }}
-    
-    - User: "show me the top 5 highest rated movies"
-    - AI: query {{ listMovies(sortBy: "Rating", order: "DESC", limit: 5) {{ Title Year Rating Runtime Description Director Actors }} }}
-    
-    - User: "find the movie the dark knight"
-    - AI: query {{ getMovie(title: "The Dark Knight") {{ Title Year Rating Runtime Description Director Actors }} }}
-
-    - User: "find all Christopher Nolan movies"
-    - AI: query {{ listMovies(filter: {{directorContains: "Christopher Nolan"}}) {{ Title Year Rating Runtime Description Director Actors }} }}
-
-    - User: "get movies that feature Leonardo DiCaprio"
-    - AI: query {{ listMovies(filter: {{actorContains: "Leonardo DiCaprio"}}) {{ Title Year Rating Runtime Description Director Actors }} }}
-
-    - User: "list comedy movies released in 2015"
-    - AI: query {{ listMovies(filter: {{genreContains: "Comedy", exactYear: 2015}}) {{ Title Year Rating Runtime Description Director Actors }} }}
-
-    - User: "show me movies shorter than 100 minutes"
-    - AI: query {{ listMovies(filter: {{maxRuntime: 100}}) {{ Title Year Rating Runtime Description Director Actors }} }}
-
-    Important:
-    - Always normalize user input for titles (case-insensitive allowed) when using getMovie, listMovies, updateMovie or deleteMovie.
-    -If the user requests any movie by title (case-insensitive allowed) using prompts like 'show me...', 'find...', 'tell me about...', always use getMovie.
-    - If the user requests multiple movies, always use listMovies with appropriate filters.
-    -If the user requests a specific movie to be deleted, always use deleteMovie.
-    - If the user requests a specific movie to be updated, always use updateMovie.
-    - If the user requests a new movie to be added, always use createMovie.
-    - If the user requests sorting, use sortBy and order parameters in listMovies.
-    - If the user requests a limit on the number of results, use the limit parameter in listMovies.
-    - If the user requests filtering based on rating, year, genre, director, actors, or runtime, use the filter parameter in listMovies.
-    -If there is a spelling mistake in the movie title, correct it to the best of your ability.
-    -If listMovies or getMovie produces an empty list provide the response that no result is found.
-    - Always ensure the generated GraphQL query or mutation is syntactically correct.
-    
-    - When generating queries for listMovies or getMovie, always request at least:
-    {{
-      Title,
-      Year,
-      Rating,
-      Runtime,
-      Description,
-      Director,
-      Actors
-    }}
-    --- USER REQUEST ---
-    User: "{user_query}"
-    AI:
-    """
+    source, graphql_query_str = translate_locally(user_query)
 
     try:
-        api_payload = {
-            "model": "qwen2.5:1.5b",
-            "messages": [{"role": "user", "content": prompt}],
-            "stream": False,
-            "options": {"temperature": 0}
-        }
-        response = requests.post(OLLAMA_API_URL, json=api_payload)
-        response.raise_for_status()
-        
-        response_data = response.json()
-        graphql_query_str = response_data['message']['content'].strip().replace("```graphql", "").replace("```", "")
-        
+        if source == "llm":
+            payload = ollama_payload(user_query)
+            with span("llm"), ollama_session() as session:
+                response = session.post(OLLAMA_API_URL, json=payload, timeout=OLLAMA_TIMEOUT)
+                response.raise_for_status()
+            graphql_query_str = graphql_from_llm(response.json()['message']['content'])
+
         graphql_payload = {"query": graphql_query_str}
-        success, result = graphql_sync(schema, graphql_payload, context_value=request)
-        
-        
-        return jsonify({
-            "llm_query": graphql_query_str,
-            "result": result
-        })
+        success, result = document_cache.execute(graphql_payload, context_value=request)
+        return jsonify(chatbot_response(user_query, graphql_query_str, source, success, result))
 
     except requests.exceptions.RequestException as e:
         print(f"Could not connect to Ollama API: {e}")
+        LLM_ERRORS.inc(reason=llm_error_reason(e))
         return jsonify({"error": "Failed to connect to the Ollama service."}), 500
     except Exception as e:
         print(f"An error occurred: {e}")
         return jsonify({"error": str(e)}), 500
 
+# --- Streaming chatbot ---
+# /chatbot/stream answers with newline-delimited JSON events:
+#   {"event": "token", "content": ...}     LLM output as it is generated (LLM translations only)
+#   {"event": "query", "llm_query": ..., "source": ..., "cached": ...}
+#   {"event": "row", "field": "listMovies", "data": movie}   one per listed movie
+#   {"event": "result", "result": ...}     any other GraphQL result, in one piece
+#   {"event": "error", "error": ...}
+#   {"event": "done"}
+
+def ndjson(event):
+    return json.dumps(event) + "\n"
+
+def query_event(graphql_query_str, source):
+    return {"event": "query", "llm_query": graphql_query_str, "source": source, "cached": source == "cache"}
+
+def result_events(result):
+    """Split a GraphQL result into row events (plain listMovies results) or a single result event."""
+    data = result.get("data") or {}
+    if not result.get("errors") and list(data) == ["listMovies"] and isinstance(data["listMovies"], list):
+        for movie in data["listMovies"]:
+            yield {"event": "row", "field": "listMovies", "data": movie}
+    else:
+        yield {"event": "result", "result": result}
+
+def stream_llm_tokens(user_query):
+    """Yield the LLM output piece by piece from a streamed Ollama chat response."""
+    payload = ollama_payload(user_query, stream=True)
+    with span("llm"), ollama_session() as session, \
+            session.post(OLLAMA_API_URL, json=payload, timeout=OLLAMA_TIMEOUT, stream=True) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if line:
+                chunk = json.loads(line)
+                yield chunk.get("message", {}).get("content", "")
+
+@app.route('/chatbot/stream', methods=['POST'])
+def chatbot_stream():
+    user_query = request.json.get("query")
+    if not user_query:
+        return jsonify({"error": "No query provided"}), 400
+
+    source, graphql_query_str = translate_locally(user_query)
+
+    def events():
+        nonlocal graphql_query_str
+        try:
+            if source == "llm":
+                content = ""
+                for token in stream_llm_tokens(user_query):
+                    if not token:
+                        continue
+                    content += token
+                    yield ndjson({"event": "token", "content": token})
+                graphql_query_str = graphql_from_llm(content)
+            yield ndjson(query_event(graphql_query_str, source))
+
+            success, result = document_cache.execute({"query": graphql_query_str}, context_value=request)
+            remember_translation(user_query, graphql_query_str, source, success, result)
+            for event in result_events(result):
+                yield ndjson(event)
+            yield ndjson({"event": "done"})
+
+        except requests.exceptions.RequestException as e:
+            print(f"Could not connect to Ollama API: {e}")
+            LLM_ERRORS.inc(reason=llm_error_reason(e))
+            yield ndjson({"event": "error", "error": "Failed to connect to the Ollama service."})
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            yield ndjson({"event": "error", "error": str(e)})
+
+    return Response(stream_with_context(events()), mimetype="application/x-ndjson")
+
+@app.route('/chatbot/cache', methods=['GET'])
+def chatbot_cache_stats():
+    return jsonify(translation_cache.stats())
+
+@app.route('/chatbot/cache', methods=['DELETE'])
+def chatbot_cache_clear():
+    translation_cache.clear()
+    return jsonify(translation_cache.stats())
+
+# --- Metrics ---
+# Every request records its spans (see metrics.py), returned as a Server-Timing
+# header; GET /metrics serves all counters and histograms in the Prometheus format.
+REGISTRY.collector(cache_collector("documents", document_cache.stats))
+REGISTRY.collector(cache_collector("results", result_cache.stats))
+REGISTRY.collector(cache_collector("translations", translation_cache.stats))
+profiler = SamplingProfiler()
+
+@app.before_request
+def start_request_trace():
+    g.trace_token = start_trace()
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    # Streamed bodies are still being generated: their latency is the time to the headers
+    endpoint = request.url_rule.rule if request.url_rule else "other"
+    HTTP_SECONDS.observe(time.perf_counter() - g.request_start, method=request.method, endpoint=endpoint,
+                         status=str(response.status_code))
+    spans = trace_spans()
+    if spans:
+        response.headers["Server-Timing"] = server_timing(spans)
+    return response
+
+@app.teardown_request
+def end_request_trace(exc):
+    # Runs twice for stream_with_context responses: once for the request, once after the stream
+    token = g.pop("trace_token", None)
+    if token is not None:
+        end_trace(token)
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+def profiler_command(data):
+    """Start or stop the profiler from a {"enabled": bool, "interval": seconds} body."""
+    if not isinstance(data, dict) or not isinstance(data.get("enabled"), bool):
+        raise ValueError('Expected {"enabled": true|false, "interval": seconds}')
+    if data["enabled"]:
+        profiler.start(data.get("interval") or 0.01, reset=data.get("reset", True))
+    else:
+        profiler.stop()
+    return profiler.stats()
+
+if PROFILER_ENDPOINT:
+    @app.route('/debug/profiler', methods=['GET'])
+    def profiler_stats():
+        return jsonify(profiler.stats())
+
+    @app.route('/debug/profiler', methods=['POST'])
+    def profiler_toggle():
+        try:
+            return jsonify(profiler_command(request.get_json(silent=True)))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+    @app.route('/debug/profiler/stacks', methods=['GET'])
+    def profiler_stacks():
+        return Response(profiler.collapsed(idle=request.args.get("idle") == "1"), mimetype="text/plain")
+
+# --- Bulk import ---
+# POST /movies/import with a CSV (data/imdb.csv layout) or NDJSON body; the
+# format comes from ?format=csv|ndjson or the Content-Type. The body is read and
+# applied chunk by chunk, so memory stays bounded and each full batch is committed
+# as soon as it has arrived. The reply streams one event per batch (see bulk.py)
+# as it is committed.
+IMPORT_CHUNK_SIZE = 64 * 1024
+
+@app.route('/movies/import', methods=['POST'])
+def movies_import():
+    try:
+        importer = BulkImport(storage, upload_format(request.args.get("format"), request.content_type),
+                              IMPORT_BATCH_SIZE)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    def events():
+        try:
+            while chunk := request.stream.read(IMPORT_CHUNK_SIZE):
+                yield from map(ndjson, importer.feed(chunk))
+            yield from map(ndjson, importer.finish())
+        except ValueError as e:
+            yield ndjson({"event": "error", "error": str(e)})
+
+    return Response(stream_with_context(events()), mimetype="application/x-ndjson")
+
 if __name__ == "__main__":
     app.run(debug=True, port=5000)
@@ -0,0 +1,264 @@
+import os
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from app import (IMPORT_BATCH_SIZE, OLLAMA_API_URL, OLLAMA_TIMEOUT, PROFILER_ENDPOINT, chatbot_response,
+                 document_cache, explorer, graphql_cache_stats_json, graphql_from_llm, ndjson, ollama_payload,
+                 profiler, profiler_command, query_event, remember_translation, result_events, storage,
+                 translate_locally, translation_cache)
+from bulk import BulkImport, upload_format
+from metrics import (CONTENT_TYPE, HTTP_SECONDS, LLM_ERRORS, REGISTRY, end_trace, server_timing, span,
+                     start_trace, trace_spans)
+from ollama_client import AsyncOllamaClient, OllamaBusy
+
+# --- Async serving mode ---
+# Same endpoints as app.py, served by an ASGI server:
+#   uvicorn asgi:app --app-dir backend --port 5000
+# GraphQL runs on Ariadne's async executor and LLM calls go through a pooled,
+# non-blocking client, so a slow Ollama call doesn't hold a worker.
+OLLAMA_MAX_CONCURRENCY = int(os.environ.get("MOVIEBOT_OLLAMA_MAX_CONCURRENCY", "4"))
+OLLAMA_QUEUE_TIMEOUT = float(os.environ.get("MOVIEBOT_OLLAMA_QUEUE_TIMEOUT", "30"))
+
+ollama = AsyncOllamaClient(OLLAMA_API_URL, OLLAMA_MAX_CONCURRENCY, OLLAMA_TIMEOUT, OLLAMA_QUEUE_TIMEOUT)
+
+
+@REGISTRY.collector
+def ollama_collector():
+    stats = ollama.stats()
+    return [
+        ("moviebot_llm_in_flight", "gauge", "LLM calls in progress", [({}, stats["inFlight"])]),
+        ("moviebot_llm_waiting", "gauge", "Requests queued for an LLM slot", [({}, stats["waiting"])]),
+        ("moviebot_llm_upstream_calls_total", "counter", "Calls sent to Ollama", [({}, stats["upstreamCalls"])]),
+        ("moviebot_llm_coalesced_total", "counter", "Requests that joined an identical in-flight call",
+         [({}, stats["coalesced"])]),
+    ]
+
+
+class RequestMetrics:
+    """ASGI middleware doing what app.py's before/after_request hooks do for Flask:
+    trace the request's spans, observe its latency and add the Server-Timing header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        token = start_trace()
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                # As in Flask, streamed bodies are timed to the response headers
+                route = scope.get("route")
+                HTTP_SECONDS.observe(time.perf_counter() - start, method=scope["method"],
+                                     endpoint=getattr(route, "path", "other"), status=str(message["status"]))
+                spans = trace_spans()
+                if spans:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"server-timing", server_timing(spans).encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            end_trace(token)
+
+
+async def graphql_playground(request):
+    return HTMLResponse(explorer.html(None))
+
+
+async def graphql_server(request):
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    success, result = await document_cache.execute_async(data, context_value=request)
+    return JSONResponse(result, status_code=200 if success else 400)
+
+
+async def graphql_cache_stats(request):
+    return JSONResponse(graphql_cache_stats_json())
+
+
+async def chatbot(request):
+    user_query = (await request.json()).get("query")
+    if not user_query:
+        return JSONResponse({"error": "No query provided"}, status_code=400)
+
+    source, graphql_query_str = translate_locally(user_query)
+
+    try:
+        if source == "llm":
+            payload = ollama_payload(user_query)
+            with span("llm"):
+                response_data = await ollama.chat(payload)
+            graphql_query_str = graphql_from_llm(response_data['message']['content'])
+
+        graphql_payload = {"query": graphql_query_str}
+        success, result = await document_cache.execute_async(graphql_payload, context_value=request)
+        return JSONResponse(chatbot_response(user_query, graphql_query_str, source, success, result))
+
+    except OllamaBusy as e:
+        LLM_ERRORS.inc(reason="busy")
+        return JSONResponse({"error": str(e)}, status_code=503)
+    except httpx.TimeoutException as e:
+        print(f"Ollama API timed out: {e!r}")
+        LLM_ERRORS.inc(reason="timeout")
+        return JSONResponse({"error": "The Ollama service timed out."}, status_code=504)
+    except httpx.HTTPError as e:
+        print(f"Could not connect to Ollama API: {e!r}")
+        LLM_ERRORS.inc(reason="connection")
+        return JSONResponse({"error": "Failed to connect to the Ollama service."}, status_code=500)
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+async def chatbot_stream(request):
+    # Same newline-delimited JSON events as the Flask /chatbot/stream
+    user_query = (await request.json()).get("query")
+    if not user_query:
+        return JSONResponse({"error": "No query provided"}, status_code=400)
+
+    source, graphql_query_str = translate_locally(user_query)
+
+    async def events():
+        nonlocal graphql_query_str
+        try:
+            if source == "llm":
+                content = ""
+                payload = ollama_payload(user_query, stream=True)
+                with span("llm"):
+                    async for token in ollama.chat_stream(payload):
+                        if not token:
+                            continue
+                        content += token
+                        yield ndjson({"event": "token", "content": token})
+                graphql_query_str = graphql_from_llm(content)
+            yield ndjson(query_event(graphql_query_str, source))
+
+            success, result = await document_cache.execute_async({"query": graphql_query_str}, context_value=request)
+            remember_translation(user_query, graphql_query_str, source, success, result)
+            for event in result_events(result):
+                yield ndjson(event)
+            yield ndjson({"event": "done"})
+
+        except OllamaBusy as e:
+            LLM_ERRORS.inc(reason="busy")
+            yield ndjson({"event": "error", "error": str(e)})
+        except httpx.TimeoutException as e:
+            print(f"Ollama API timed out: {e!r}")
+            LLM_ERRORS.inc(reason="timeout")
+            yield ndjson({"event": "error", "error": "The Ollama service timed out."})
+        except httpx.HTTPError as e:
+            print(f"Could not connect to Ollama API: {e!r}")
+            LLM_ERRORS.inc(reason="connection")
+            yield ndjson({"event": "error", "error": "Failed to connect to the Ollama service."})
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            yield ndjson({"event": "error", "error": str(e)})
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+async def chatbot_cache_stats(request):
+    return JSONResponse(translation_cache.stats())
+
+
+async def chatbot_cache_clear(request):
+    translation_cache.clear()
+    return JSONResponse(translation_cache.stats())
+
+
+async def chatbot_ollama_stats(request):
+    return JSONResponse(ollama.stats())
+
+
+async def movies_import(request):
+    # Same CSV/NDJSON upload and progress events as the Flask /movies/import.
+    # Parsing and the storage transactions run in the threadpool, one body chunk at a time.
+    try:
+        importer = BulkImport(storage, upload_format(request.query_params.get("format"),
+                                                     request.headers.get("content-type")), IMPORT_BATCH_SIZE)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    # Unlike the Flask endpoint, this one sends the events once the body is
+    # consumed: a StreamingResponse would compete with request.stream() for the
+    # receive channel.
+    events = []
+    try:
+        async for chunk in request.stream():
+            events += await run_in_threadpool(importer.feed, chunk)
+        events += await run_in_threadpool(importer.finish)
+    except ValueError as e:
+        events.append({"event": "error", "error": str(e)})
+    return Response("".join(map(ndjson, events)), media_type="application/x-ndjson")
+
+
+async def metrics(request):
+    return Response(REGISTRY.render(), headers={"content-type": CONTENT_TYPE})
+
+
+async def profiler_stats(request):
+    return JSONResponse(profiler.stats())
+
+
+async def profiler_toggle(request):
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    try:
+        return JSONResponse(profiler_command(data))
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+
+async def profiler_stacks(request):
+    return Response(profiler.collapsed(idle=request.query_params.get("idle") == "1"), media_type="text/plain")
+
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    await ollama.aclose()
+    profiler.stop()
+
+
+profiler_routes = [
+    Route("/debug/profiler", profiler_stats, methods=["GET"]),
+    Route("/debug/profiler", profiler_toggle, methods=["POST"]),
+    Route("/debug/profiler/stacks", profiler_stacks, methods=["GET"]),
+] if PROFILER_ENDPOINT else []
+
+app = Starlette(
+    routes=[
+        Route("/graphql", graphql_playground, methods=["GET"]),
+        Route("/graphql", graphql_server, methods=["POST"]),
+        Route("/graphql/cache", graphql_cache_stats, methods=["GET"]),
+        Route("/chatbot", chatbot, methods=["POST"]),
+        Route("/chatbot/stream", chatbot_stream, methods=["POST"]),
+        Route("/chatbot/cache", chatbot_cache_stats, methods=["GET"]),
+        Route("/chatbot/cache", chatbot_cache_clear, methods=["DELETE"]),
+        Route("/chatbot/ollama", chatbot_ollama_stats, methods=["GET"]),
+        Route("/movies/import", movies_import, methods=["POST"]),
+        Route("/metrics", metrics, methods=["GET"]),
+    ] + profiler_routes,
+    middleware=[Middleware(RequestMetrics)],
+    lifespan=lifespan,
+)
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, port=5000)
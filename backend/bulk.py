@@ -0,0 +1,222 @@
+import codecs
+import csv
+import json
+import math
+
+# --- Bulk import ---
+# Uploads use the data/imdb.csv layout, or one JSON object per line with the
+# same keys. The body is parsed as it arrives and every `batch_size` rows go to
+# storage.create_movies, i.e. one transaction and one journal record per batch.
+# The outcome is reported as newline-delimited JSON events:
+#   {"event": "batch", "batch": n, "rows": ..., "created": ..., "errors": [{"row", "title", "message"}]}
+#   {"event": "done", "rows": ..., "created": ..., "failed": ...}
+
+FORMATS = ("csv", "ndjson")
+TEXT_FIELDS = ("Title", "Genre", "Description", "Director", "Actors")
+INT_FIELDS = ("Year", "Runtime", "Votes")
+FLOAT_FIELDS = ("Rating", "Revenue")
+# A quoted CSV field still open after this many lines or characters is taken to
+# be a stray quote: its row is reported and the lines after it are parsed anew.
+MAX_RECORD_LINES = 100
+MAX_RECORD_CHARS = 1 << 20
+
+
+def upload_format(format, content_type):
+    """The upload format from an explicit ?format= value, else from the Content-Type."""
+    if format:
+        if format not in FORMATS:
+            raise ValueError(f"Unknown format '{format}', expected one of: {', '.join(FORMATS)}")
+        return format
+    return "csv" if "csv" in (content_type or "") else "ndjson"
+
+
+def _number(field, value, kind):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} is not a number: {value!r}") from None
+    if not math.isfinite(number):
+        raise ValueError(f"{field} is not a number: {value!r}")
+    if kind is int:
+        if not number.is_integer():
+            raise ValueError(f"{field} must be a whole number: {value!r}")
+        return int(number)
+    return number
+
+
+def movie_from_row(row):
+    """MovieInput dict from one uploaded row; raises ValueError for invalid rows.
+
+    Empty values become null. Ids is ignored: new movies get the next free Ids.
+    """
+    movie = {}
+    for field in TEXT_FIELDS:
+        value = row.get(field)
+        if value is None or value == "":
+            continue
+        if not isinstance(value, str):
+            raise ValueError(f"{field} must be a string")
+        movie[field] = value
+    for fields, kind in ((INT_FIELDS, int), (FLOAT_FIELDS, float)):
+        for field in fields:
+            value = row.get(field)
+            if value is not None and value != "":
+                movie[field] = _number(field, value, kind)
+    if not movie.get("Title", "").strip():
+        raise ValueError("Title is required")
+    return movie
+
+
+class RowParser:
+    """Incremental CSV/NDJSON parser: feed it byte chunks, get back parsed rows.
+
+    Each row comes back as (row number, title, movie dict, error message), with
+    either the movie or the error set; row numbers count data rows from 1. A
+    CSV record may span several lines inside a quoted field.
+    """
+
+    def __init__(self, format):
+        self.format = format
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self._buffer = ""
+        self._lines = 0        # physical lines read, for error messages
+        self._record = []      # lines of a CSV record with a quoted field still open
+        self._record_start = 0
+        self._record_chars = 0
+        self._quoted = False   # whether the quotes in _record are unbalanced
+        self._header = None
+        self.rows = 0
+
+    def feed(self, chunk, final=False):
+        self._buffer += self._decoder.decode(chunk, final)
+        *lines, self._buffer = self._buffer.split("\n")
+        if final:
+            lines.append(self._buffer)
+            self._buffer = ""
+        # CRLF uploads: drop the "\r" of every line ending, including the ones
+        # inside multi-line quoted fields, so stored text only has "\n".
+        lines = [line[:-1] if line.endswith("\r") else line for line in lines]
+        parsed = []
+        for line in lines:
+            self._lines += 1
+            parsed += self._line(self._lines, line)
+        while final and self._record:
+            parsed += self._unterminated()
+        return parsed
+
+    def _error(self, message, title=None):
+        self.rows += 1
+        return self.rows, title if isinstance(title, str) else None, None, message
+
+    def _line(self, number, line):
+        """The rows completed by physical line `number` (usually none or one)."""
+        if self.format == "ndjson":
+            row = self._json_row(line)
+            return [row] if row else []
+        if not self._record:
+            self._record_start = number
+        self._record.append(line)
+        self._record_chars += len(line) + 1
+        # Inside a quoted field until the quotes balance (escaped quotes come in
+        # pairs); only the new line's quotes are counted.
+        if line.count('"') % 2:
+            self._quoted = not self._quoted
+        if not self._quoted:
+            record = "\n".join(self._record) + "\n"
+            self._record, self._record_chars = [], 0
+            row = self._csv_row(record)
+            return [row] if row else []
+        if len(self._record) > MAX_RECORD_LINES or self._record_chars > MAX_RECORD_CHARS:
+            return self._unterminated()
+        return []
+
+    def _unterminated(self):
+        """Report the row whose quote never closed and parse the lines after it on their own."""
+        start, rest = self._record_start, self._record[1:]
+        self._record, self._record_chars, self._quoted = [], 0, False
+        rows = [self._error(f"unterminated quoted field starting on line {start}")]
+        for number, line in enumerate(rest, start + 1):
+            rows += self._line(number, line)
+        return rows
+
+    def _json_row(self, line):
+        if not line.strip():
+            return None
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            return self._error(f"invalid JSON: {e}")
+        if not isinstance(row, dict):
+            return self._error("expected a JSON object")
+        return self._movie(row)
+
+    def _csv_row(self, record):
+        if not record.strip():
+            return None
+        values = next(csv.reader([record]))
+        if self._header is None:
+            self._header = [name.strip() for name in values]
+            if "Title" not in self._header:
+                raise ValueError("CSV header has no Title column")
+            return None
+        if len(values) != len(self._header):
+            return self._error(f"expected {len(self._header)} fields, got {len(values)}")
+        return self._movie(dict(zip(self._header, values)))
+
+    def _movie(self, row):
+        try:
+            movie = movie_from_row(row)
+        except ValueError as e:
+            return self._error(str(e), row.get("Title"))
+        self.rows += 1
+        return self.rows, movie["Title"], movie, None
+
+
+class BulkImport:
+    """Feeds an upload through a RowParser into storage, one batch at a time.
+
+    `feed` and `finish` return the progress events for the batches they completed.
+    """
+
+    def __init__(self, storage, format, batch_size=1000):
+        self.storage = storage
+        self.parser = RowParser(format)
+        self.batch_size = batch_size
+        self.batches = 0
+        self.created = 0
+        self.failed = 0
+        self._pending = []  # parsed rows, see RowParser
+
+    def feed(self, chunk):
+        return self._add(self.parser.feed(chunk))
+
+    def finish(self):
+        events = self._add(self.parser.feed(b"", final=True))
+        if self._pending:
+            events.append(self._flush())
+        events.append({"event": "done", "rows": self.parser.rows, "created": self.created, "failed": self.failed})
+        return events
+
+    def _add(self, rows):
+        events = []
+        for row in rows:
+            self._pending.append(row)
+            if len(self._pending) >= self.batch_size:
+                events.append(self._flush())
+        return events
+
+    def _flush(self):
+        batch, self._pending = self._pending, []
+        valid = [(number, title, movie) for number, title, movie, _ in batch if movie is not None]
+        errors = [{"row": number, "title": title, "message": error}
+                  for number, title, movie, error in batch if movie is None]
+        created, rejected = self.storage.create_movies([movie for _, _, movie in valid]) if valid else ([], [])
+        for i in rejected:
+            number, title, _ = valid[i]
+            errors.append({"row": number, "title": title, "message": f"Movie with title '{title}' already exists."})
+        errors.sort(key=lambda e: e["row"])
+        self.batches += 1
+        self.created += len(created)
+        self.failed += len(errors)
+        return {"event": "batch", "batch": self.batches, "rows": len(batch), "created": len(created),
+                "errors": errors}
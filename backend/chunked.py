@@ -0,0 +1,305 @@
+import bisect
+from itertools import chain
+
+# --- Copy-on-write chunked containers ---
+# MemoryStorage publishes every write as a new MovieStore version, so the store
+# and its indexes are copied once per mutation. Copying a dict, set or list
+# costs its whole size. These containers keep their contents in chunks instead:
+# `copy()` shares the chunk table, and the first change to a chunk copies the
+# table and that chunk only. A write then costs about the size of the chunks it
+# touches (roughly sqrt(n) entries each) rather than the whole catalog.
+#
+# Each side of a copy may be changed independently afterwards; a chunk is
+# copied at most once per side.
+
+CHUNK_BITS = 10
+CHUNK_SIZE = 1 << CHUNK_BITS  # entries per ChunkedList chunk, and per sorted run
+
+
+class _Chunked:
+    __slots__ = ("_chunks", "_len", "_owned", "_shared")
+
+    def _reset(self, chunks, length):
+        self._chunks = chunks
+        self._len = length
+        self._owned = None   # chunk numbers this side may change in place; None = all of them
+        self._shared = False  # True while the chunk table is shared with a copy
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        return chain.from_iterable(self._chunks)
+
+    def copy(self):
+        clone = object.__new__(type(self))
+        for name in self._state:
+            setattr(clone, name, getattr(self, name))
+        clone._owned, self._owned = set(), set()
+        clone._shared = self._shared = True
+        return clone
+
+    _state = ("_chunks", "_len")
+
+    def _unshare(self):
+        self._chunks = list(self._chunks)
+        self._shared = False
+
+    def _writable(self, i):
+        owned = self._owned
+        if owned is not None and i not in owned:
+            if self._shared:
+                self._unshare()
+            self._chunks[i] = self._chunks[i].copy()
+            owned.add(i)
+        return self._chunks[i]
+
+
+class _Hashed(_Chunked):
+    # Keys go to chunk hash(key) & mask. The number of chunks is a power of two
+    # that doubles (rehashing everything once) when chunks average more than
+    # twice their count, so both stay around sqrt(n).
+    __slots__ = ("_mask",)
+    _state = ("_chunks", "_len", "_mask")
+
+    def _rebuild(self, entries, length):
+        size = 1
+        while size * size < length:
+            size *= 2
+        chunks = [self._chunk_type() for _ in range(size)]
+        self._mask = size - 1
+        self._fill(chunks, entries)
+        self._reset(chunks, sum(map(len, chunks)))
+
+    def _grown(self):
+        size = self._mask + 1
+        if self._len > 2 * size * size:
+            self._rebuild(self._entries(), self._len)
+
+    def __contains__(self, key):
+        return key in self._chunks[hash(key) & self._mask]
+
+    def chunks(self):
+        """The underlying chunks, e.g. for `target.update(*x.chunks())`. Do not modify them."""
+        return self._chunks
+
+
+class ChunkedMap(_Hashed):
+    """Unordered dict-like map (iterating yields keys) whose copies share chunks."""
+
+    __slots__ = ()
+    _chunk_type = dict
+
+    def __init__(self, items=()):
+        items = list(items.items() if isinstance(items, dict) else items)
+        self._rebuild(items, len(items))
+
+    @staticmethod
+    def _fill(chunks, items):
+        mask = len(chunks) - 1
+        for key, value in items:
+            chunks[hash(key) & mask][key] = value
+
+    def _entries(self):
+        return list(self.items())
+
+    def __getitem__(self, key):
+        return self._chunks[hash(key) & self._mask][key]
+
+    def get(self, key, default=None):
+        return self._chunks[hash(key) & self._mask].get(key, default)
+
+    def get_many(self, keys):
+        chunks, mask = self._chunks, self._mask
+        return [chunks[hash(key) & mask][key] for key in keys]
+
+    def __setitem__(self, key, value):
+        chunk = self._writable(hash(key) & self._mask)
+        size = len(chunk)
+        chunk[key] = value
+        if len(chunk) > size:
+            self._len += 1
+            self._grown()
+
+    def __delitem__(self, key):
+        del self._writable(hash(key) & self._mask)[key]
+        self._len -= 1
+
+    def pop(self, key, *default):
+        i = hash(key) & self._mask
+        if key not in self._chunks[i]:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        self._len -= 1
+        return self._writable(i).pop(key)
+
+    def values(self):
+        return chain.from_iterable(chunk.values() for chunk in self._chunks)
+
+    def items(self):
+        return chain.from_iterable(chunk.items() for chunk in self._chunks)
+
+
+class ChunkedSet(_Hashed):
+    """Unordered set whose copies share chunks."""
+
+    __slots__ = ()
+    _chunk_type = set
+
+    def __init__(self, items=()):
+        items = list(items)
+        self._rebuild(items, len(items))
+
+    @staticmethod
+    def _fill(chunks, items):
+        mask = len(chunks) - 1
+        for item in items:
+            chunks[hash(item) & mask].add(item)
+
+    def _entries(self):
+        return list(self)
+
+    def add(self, item):
+        chunk = self._writable(hash(item) & self._mask)
+        size = len(chunk)
+        chunk.add(item)
+        if len(chunk) > size:
+            self._len += 1
+            self._grown()
+
+    def discard(self, item):
+        i = hash(item) & self._mask
+        if item in self._chunks[i]:
+            self._writable(i).discard(item)
+            self._len -= 1
+
+    def update(self, items):
+        mask, groups = self._mask, {}
+        for item in items:
+            groups.setdefault(hash(item) & mask, []).append(item)
+        for i, group in groups.items():
+            chunk = self._writable(i)
+            size = len(chunk)
+            chunk.update(group)
+            self._len += len(chunk) - size
+        self._grown()
+
+
+class ChunkedList(_Chunked):
+    """List in chunks of CHUNK_SIZE entries that can be appended to and assigned by position."""
+
+    __slots__ = ()
+
+    def __init__(self, items=()):
+        items = list(items)
+        self._reset([items[i:i + CHUNK_SIZE] for i in range(0, len(items), CHUNK_SIZE)], len(items))
+
+    def __getitem__(self, position):
+        return self._chunks[position >> CHUNK_BITS][position & (CHUNK_SIZE - 1)]
+
+    def __setitem__(self, position, value):
+        self._writable(position >> CHUNK_BITS)[position & (CHUNK_SIZE - 1)] = value
+
+    def take(self, positions):
+        """The entries at `positions`, in that order."""
+        chunks, low = self._chunks, CHUNK_SIZE - 1
+        return [chunks[p >> CHUNK_BITS][p & low] for p in positions]
+
+    def append(self, value):
+        if not self._len & (CHUNK_SIZE - 1):
+            # A new chunk is private to this side from the start
+            if self._shared:
+                self._unshare()
+            self._chunks.append([])
+            if self._owned is not None:
+                self._owned.add(len(self._chunks) - 1)
+        self._writable(len(self._chunks) - 1).append(value)
+        self._len += 1
+
+
+class ChunkedSortedList(_Chunked):
+    """Sorted list in runs of CHUNK_SIZE to 2 * CHUNK_SIZE items, with bisect-style lookups.
+
+    `_maxes` holds the last item of every run to find the run an item belongs to.
+    """
+
+    __slots__ = ("_maxes",)
+    _state = ("_chunks", "_len", "_maxes")
+
+    def __init__(self, items=()):
+        self._reset([], 0)
+        self._maxes = []
+        self.load(items)
+
+    def load(self, items):
+        """Replace the contents with `items` plus the current ones, sorted once."""
+        items = sorted(chain(self, items))
+        self._reset([items[i:i + CHUNK_SIZE] for i in range(0, len(items), CHUNK_SIZE)], len(items))
+        self._maxes = [run[-1] for run in self._chunks]
+
+    def _unshare(self):
+        super()._unshare()
+        self._maxes = list(self._maxes)
+
+    def add(self, item):
+        if not self._chunks:
+            self._reset([[item]], 1)
+            self._maxes = [item]
+            return
+        i = min(bisect.bisect_left(self._maxes, item), len(self._maxes) - 1)
+        run = self._writable(i)
+        bisect.insort(run, item)
+        self._maxes[i] = run[-1]
+        self._len += 1
+        if len(run) > 2 * CHUNK_SIZE:
+            half = run[CHUNK_SIZE:]
+            del run[CHUNK_SIZE:]
+            self._chunks.insert(i + 1, half)
+            self._maxes[i] = run[-1]
+            self._maxes.insert(i + 1, half[-1])
+            if self._owned is not None:  # the runs after i moved up by one
+                self._owned = {j + 1 if j > i else j for j in self._owned} | {i + 1}
+
+    def remove(self, item):
+        """Remove one occurrence of `item`, if there is one."""
+        i = bisect.bisect_left(self._maxes, item)
+        if i == len(self._maxes):
+            return
+        j = bisect.bisect_left(self._chunks[i], item)
+        if j == len(self._chunks[i]) or self._chunks[i][j] != item:
+            return
+        run = self._writable(i)
+        del run[j]
+        self._len -= 1
+        if run:
+            self._maxes[i] = run[-1]
+        else:
+            del self._chunks[i]
+            del self._maxes[i]
+            if self._owned is not None:  # the runs after i moved down by one
+                self._owned = {j - 1 if j > i else j for j in self._owned if j != i}
+
+    def bisect_left(self, item):
+        i = bisect.bisect_left(self._maxes, item)
+        if i == len(self._maxes):
+            return self._len
+        return sum(map(len, self._chunks[:i])) + bisect.bisect_left(self._chunks[i], item)
+
+    def bisect_right(self, item):
+        i = bisect.bisect_right(self._maxes, item)
+        if i == len(self._maxes):
+            return self._len
+        return sum(map(len, self._chunks[:i])) + bisect.bisect_right(self._chunks[i], item)
+
+    def slice(self, start, end):
+        """Items at positions start <= i < end."""
+        items = []
+        for run in self._chunks:
+            if end <= 0:
+                break
+            if start < len(run):
+                items.extend(run[max(start, 0):end])
+            start -= len(run)
+            end -= len(run)
+        return items
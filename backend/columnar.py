@@ -0,0 +1,142 @@
+import numpy as np
+
+from aggregate import group_keys
+from planner import RANGE_FILTERS, TEXT_FILTERS
+
+NUMERIC_FIELDS = ("Year", "Runtime", "Rating", "Votes", "Revenue")
+
+
+class ColumnarMovies:
+    """Column-oriented copy of the catalog for vectorized filtering and sorting.
+
+    Numeric fields are float64 arrays with a separate null mask. Title and text
+    filters reuse the store's hash and token indexes, turned into masks over the
+    id column. Row dicts are only looked up for the rows that are returned.
+    """
+
+    def __init__(self, store):
+        self._store = store
+        self.version = store.version
+        self._rows = store.all()
+        n = len(self._rows)
+        self._ids = np.fromiter((m["Ids"] for m in self._rows), dtype=np.int64, count=n)
+        self._numeric = {}
+        self._valid = {}
+        for field in NUMERIC_FIELDS:
+            values = [m.get(field) for m in self._rows]
+            valid = np.fromiter((v is not None for v in values), dtype=bool, count=n)
+            column = np.fromiter((0.0 if v is None else v for v in values), dtype=np.float64, count=n)
+            self._numeric[field] = column
+            self._valid[field] = valid
+        self._groupings = {}
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _range_mask(self, field, op, value):
+        column, valid = self._numeric[field], self._valid[field]
+        if op == "==":
+            return valid & (column == value)
+        # Mirrors `m.get(field) and m[field] >= value`: nulls and zeros never match.
+        truthy = valid & (column != 0)
+        return truthy & (column >= value) if op == ">=" else truthy & (column <= value)
+
+    def _ids_mask(self, ids):
+        return np.isin(self._ids, np.fromiter(ids, dtype=np.int64, count=len(ids)))
+
+    def _text_mask(self, field, term):
+        ids = self._store.match_text(field, term)
+        if ids is not None:
+            return self._ids_mask(ids)
+        term = term.lower()
+        return np.fromiter((bool(m.get(field)) and term in m[field].lower() for m in self._rows),
+                           dtype=bool, count=len(self._rows))
+
+    def mask(self, filter):
+        mask = np.ones(len(self._rows), dtype=bool)
+        if "titleContains" in filter:
+            term = filter["titleContains"].lower()
+            ids = self._store.match_title(term)
+            candidates = self._rows if ids is None else self._store.rows(ids)
+            mask &= self._ids_mask([m["Ids"] for m in candidates if m.get("Title") and term in m["Title"].lower()])
+        for arg, (field, op) in RANGE_FILTERS.items():
+            if arg in filter:
+                mask &= self._range_mask(field, op, filter[arg])
+        for arg, field in TEXT_FILTERS.items():
+            if arg in filter:
+                mask &= self._text_mask(field, filter[arg])
+        return mask
+
+    def query(self, filter=None, sortBy=None, order="ASC", limit=None):
+        """Return matching movie dicts, sorted like resolve_list_movies and cut to `limit`."""
+        positions = np.flatnonzero(self.mask(filter)) if filter else np.arange(len(self._rows))
+        if sortBy and sortBy not in self._numeric:
+            # Text and unknown sort keys keep the dict-based sort.
+            reverse = bool(order) and order.upper() == "DESC"
+            rows = sorted((self._rows[i] for i in positions.tolist()), key=lambda m: m.get(sortBy) or 0, reverse=reverse)
+            return rows[:limit] if limit else rows
+        if sortBy:
+            # Nulls sort as 0, like `m.get(sortBy) or 0`; negate for DESC so the stable sort keeps ties in catalog order.
+            keys = self._numeric[sortBy][positions]
+            if order and order.upper() == "DESC":
+                keys = -keys
+            if limit and limit < len(positions):
+                # Only the rows that can make the page need a full ordering.
+                cutoff = np.partition(keys, limit - 1)[limit - 1]
+                keep = np.flatnonzero(keys <= cutoff)
+                positions, keys = positions[keep], keys[keep]
+            positions = positions[np.argsort(keys, kind="stable")]
+        if limit:
+            positions = positions[:limit]
+        rows = self._rows
+        return [rows[i] for i in positions.tolist()]
+
+    def _grouping(self, groupBy):
+        """(row positions, group codes, group keys) for aggregateMovies; built once per view.
+
+        A row appears once per group it belongs to (several genres, or the null group).
+        """
+        grouping = self._groupings.get(groupBy)
+        if grouping is None:
+            if groupBy == "Year":
+                valid = self._valid["Year"]
+                years, codes = np.unique(self._numeric["Year"][valid], return_inverse=True)
+                missing = np.flatnonzero(~valid)
+                positions = np.concatenate([np.flatnonzero(valid), missing])
+                codes = np.concatenate([codes, np.full(len(missing), len(years))])
+                keys = [int(year) for year in years.tolist()] + [None]
+            else:
+                positions, codes, index = [], [], {}
+                for position, movie in enumerate(self._rows):
+                    for key in group_keys(movie, groupBy):
+                        positions.append(position)
+                        codes.append(index.setdefault(key, len(index)))
+                keys = list(index)
+                positions, codes = np.array(positions, dtype=np.int64), np.array(codes, dtype=np.int64)
+            grouping = self._groupings[groupBy] = (positions, codes, keys)
+        return grouping
+
+    def aggregate(self, filter=None, groupBy=None, fields=()):
+        """Groups for aggregate_rows, computed with bincount over the filtered positions."""
+        if groupBy:
+            positions, codes, keys = self._grouping(groupBy)
+            if filter:
+                keep = self.mask(filter)[positions]
+                positions, codes = positions[keep], codes[keep]
+        else:
+            positions = np.flatnonzero(self.mask(filter)) if filter else np.arange(len(self._rows))
+            codes, keys = np.zeros(len(positions), dtype=np.int64), [None]
+        size = len(keys)
+        counts = np.bincount(codes, minlength=size)
+        stats = []
+        for field in fields:
+            valid = self._valid[field][positions]
+            field_codes, values = codes[valid], self._numeric[field][positions][valid]
+            low, high = np.full(size, np.inf), np.full(size, -np.inf)
+            np.minimum.at(low, field_codes, values)
+            np.maximum.at(high, field_codes, values)
+            stats.append((np.bincount(field_codes, minlength=size).tolist(),
+                          np.bincount(field_codes, weights=values, minlength=size).tolist(),
+                          low.tolist(), high.tolist()))
+        return {key: (count, [(n[code], total[code], low[code], high[code]) for n, total, low, high in stats])
+                for code, (key, count) in enumerate(zip(keys, counts.tolist())) if count or not groupBy}
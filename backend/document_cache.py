@@ -0,0 +1,119 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from ariadne import graphql as graphql_async, graphql_sync
+from graphql import GraphQLError, parse, validate
+
+from metrics import span
+
+
+def query_hash(query):
+    return hashlib.sha256(query.encode("utf-8")).hexdigest()
+
+
+class DocumentCache:
+    """LRU cache of parsed and validated GraphQL documents, keyed by the SHA-256 of the query text.
+
+    Executing a query that is already cached skips both parsing and validation.
+    Clients can also use persisted queries (Apollo's automatic persisted
+    queries protocol) and send only `extensions.persistedQuery.sha256Hash`.
+    A hash that isn't cached gets a PersistedQueryNotFound error, and the client
+    then sends the full query together with its hash to register it.
+
+    `extensions` (Ariadne extensions) are passed to every execution.
+    """
+
+    def __init__(self, schema, max_size=512, extensions=None):
+        self.schema = schema
+        self.max_size = max_size
+        self.extensions = extensions
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # hash -> (query text, document, validation errors)
+        self._lock = threading.Lock()
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return entry
+
+    def _store(self, key, query):
+        # Syntax errors raise GraphQLError and are left to graphql_sync to report.
+        with span("graphql_parse"):
+            document = parse(query)
+        with span("graphql_validate"):
+            entry = (query, document, validate(self.schema, document))
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return entry
+
+    def _prepare(self, data):
+        # Returns (error result, None, None) or (None, request data, extra graphql kwargs).
+        if not isinstance(data, dict):
+            return None, data, {}
+        query = data.get("query")
+        persisted = (data.get("extensions") or {}).get("persistedQuery") or {}
+        key = persisted.get("sha256Hash") if isinstance(persisted, dict) else None
+
+        if key is not None and isinstance(query, str) and query_hash(query) != key:
+            return (False, {"errors": [{"message": "provided sha does not match query",
+                                        "extensions": {"code": "PERSISTED_QUERY_HASH_MISMATCH"}}]}), None, None
+        if key is None:
+            if not query or not isinstance(query, str):
+                return None, data, {}
+            key = query_hash(query)
+
+        entry = self._lookup(key)
+        if entry is None:
+            if not query or not isinstance(query, str):
+                return (False, {"errors": [{"message": "PersistedQueryNotFound",
+                                            "extensions": {"code": "PERSISTED_QUERY_NOT_FOUND"}}]}), None, None
+            try:
+                entry = self._store(key, query)
+            except GraphQLError:
+                # Let graphql_sync parse it again and report the syntax error
+                return None, data, {}
+
+        query, document, errors = entry
+        return None, {**data, "query": query}, {"query_document": document,
+                                                "query_validator": lambda *args, **kw: errors}
+
+    def execute(self, data, **kwargs):
+        """Run `data` (a GraphQL request body) like ariadne's graphql_sync, reusing cached documents."""
+        error, data, cached = self._prepare(data)
+        if error:
+            return error
+        with span("graphql_execute"):
+            return graphql_sync(self.schema, data, **cached, extensions=self.extensions, **kwargs)
+
+    async def execute_async(self, data, **kwargs):
+        """Async counterpart of execute, using ariadne's graphql."""
+        error, data, cached = self._prepare(data)
+        if error:
+            return error
+        with span("graphql_execute"):
+            return await graphql_async(self.schema, data, **cached, extensions=self.extensions, **kwargs)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxSize": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": self.hits / lookups if lookups else 0.0,
+            }
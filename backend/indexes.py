@@ -0,0 +1,178 @@
+import math
+
+from chunked import ChunkedMap, ChunkedSet, ChunkedSortedList
+
+
+def split_list(value):
+    return [part.strip() for part in value.split(",")]
+
+
+def split_none(value):
+    return [value.strip()]
+
+
+def ngrams(text, n):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class TokenIndex:
+    """Inverted index over a text field, answering case-insensitive substring lookups.
+
+    Each row's value is split into tokens (e.g. the comma-separated genres or
+    actors) and every token gets a posting set of movie ids. Substring lookups
+    are resolved against the token vocabulary through an n-gram index, so a
+    filter like "nolan" only touches the handful of matching tokens instead of
+    every row.
+    """
+
+    def __init__(self, field, split=split_list, gram=3):
+        self.field = field
+        self._split = split
+        self._gram = gram
+        self._postings = ChunkedMap()  # token -> ChunkedSet of Ids
+        self._grams = ChunkedMap()     # n-gram -> set of tokens
+        # Sets this index may change in place; any other set may be shared with a copy.
+        self._owned_postings = set()
+        self._owned_grams = set()
+
+    def copy(self):
+        """A copy sharing every posting/n-gram set until one side changes it."""
+        clone = object.__new__(type(self))
+        clone.field, clone._split, clone._gram = self.field, self._split, self._gram
+        clone._postings = self._postings.copy()
+        clone._grams = self._grams.copy()
+        clone._owned_postings, clone._owned_grams = set(), set()
+        self._owned_postings, self._owned_grams = set(), set()
+        return clone
+
+    def _own(self, sets, owned, key):
+        if key not in owned:
+            sets[key] = sets[key].copy()
+            owned.add(key)
+        return sets[key]
+
+    def _tokens(self, value):
+        if not value:
+            return []
+        return [t for t in self._split(value.lower()) if t]
+
+    def add(self, movie_id, value):
+        self.add_many((movie_id,), value)
+
+    def add_many(self, movie_ids, value):
+        """Index several movies that share the same field value."""
+        self.load([(movie_ids, value)])
+
+    def load(self, groups):
+        """Bulk-add (Ids, value) groups, where each group's movies share the value.
+
+        Ids are collected per token first, so every posting set is updated once.
+        """
+        tokens = {}
+        for movie_ids, value in groups:
+            for token in self._tokens(value):
+                tokens.setdefault(token, []).extend(movie_ids)
+        for token, movie_ids in tokens.items():
+            if token in self._postings:
+                self._own(self._postings, self._owned_postings, token).update(movie_ids)
+            else:
+                self._postings[token] = ChunkedSet(movie_ids)
+                self._owned_postings.add(token)
+                self._add_token(token)
+
+    def _add_token(self, token):
+        # Called when `token` enters the vocabulary
+        for g in ngrams(token, self._gram):
+            if g not in self._grams:
+                self._grams[g] = set()
+                self._owned_grams.add(g)
+            self._own(self._grams, self._owned_grams, g).add(token)
+
+    def _drop_token(self, token):
+        # Called when the last row with `token` is removed
+        for g in ngrams(token, self._gram):
+            if token in self._grams.get(g, ()):
+                tokens = self._own(self._grams, self._owned_grams, g)
+                tokens.discard(token)
+                if not tokens:
+                    del self._grams[g]
+                    self._owned_grams.discard(g)
+
+    def remove(self, movie_id, value):
+        for token in self._tokens(value):
+            if movie_id not in self._postings.get(token, ()):
+                continue
+            ids = self._own(self._postings, self._owned_postings, token)
+            ids.discard(movie_id)
+            if not ids:
+                del self._postings[token]
+                self._owned_postings.discard(token)
+                self._drop_token(token)
+
+    def matching_tokens(self, term):
+        if len(term) < self._gram:
+            # Too short for the n-gram index; the vocabulary is far smaller than the catalog.
+            return [t for t in self._postings if term in t]
+        candidates = None
+        for g in sorted(ngrams(term, self._gram), key=lambda g: len(self._grams.get(g, ()))):
+            tokens = self._grams.get(g)
+            if not tokens:
+                return []
+            candidates = set(tokens) if candidates is None else candidates & tokens
+            if not candidates:
+                return []
+        return [t for t in candidates if term in t]
+
+    def lookup(self, term):
+        """Return the ids whose field contains `term`, or None if the index cannot answer it."""
+        term = term.lower()
+        # Empty terms, and terms that span a separator or rely on surrounding
+        # whitespace, only make sense against the raw string.
+        if not term or term != term.strip() or self._split(term) != [term]:
+            return None
+        ids = set()
+        for token in self.matching_tokens(term):
+            ids.update(*self._postings[token].chunks())
+        return ids
+
+
+class RangeIndex:
+    """Sorted (value, id) index over a numeric field for bisect-based range queries."""
+
+    def __init__(self, field):
+        self.field = field
+        self._entries = ChunkedSortedList()  # (value, Ids); rows with no value are not indexed
+
+    def copy(self):
+        """A copy sharing the sorted runs until one side changes them."""
+        clone = object.__new__(RangeIndex)
+        clone.field, clone._entries = self.field, self._entries.copy()
+        return clone
+
+    def __len__(self):
+        return len(self._entries)
+
+    def load(self, pairs):
+        """Bulk-add (Ids, value) pairs with a single sort instead of one insert per row."""
+        self._entries.load((value, movie_id) for movie_id, value in pairs if value is not None)
+
+    def add(self, movie_id, value):
+        if value is not None:
+            self._entries.add((value, movie_id))
+
+    def remove(self, movie_id, value):
+        if value is not None:
+            self._entries.remove((value, movie_id))
+
+    def _bounds(self, lo, hi):
+        start = 0 if lo is None else self._entries.bisect_left((lo,))
+        end = len(self._entries) if hi is None else self._entries.bisect_right((hi, math.inf))
+        return start, max(start, end)
+
+    def count(self, lo=None, hi=None):
+        start, end = self._bounds(lo, hi)
+        return end - start
+
+    def ids(self, lo=None, hi=None):
+        start, end = self._bounds(lo, hi)
+        return [movie_id for _, movie_id in self._entries.slice(start, end)]
@@ -0,0 +1,317 @@
+import json
+import re
+
+from metrics import row_source
+from titles import MATCH_MIN_SCORE, title_words
+
+# --- Rule-based chatbot fast path ---
+# Recognizes the common request shapes from the chatbot prompt's few-shot
+# examples and builds the GraphQL directly. parse_intent returns None whenever
+# any part of the request is not understood, and the caller falls back to the LLM.
+
+MOVIE_FIELDS = "Title Year Rating Runtime Description Director Actors"
+# A misspelled title only resolves if its best match scores this much more than
+# the runner-up; closer calls go to the LLM.
+FUZZY_TITLE_LEAD = 0.1
+
+# spoken form -> genre as stored in the catalog
+GENRES = {
+    "action": "Action", "adventure": "Adventure", "adventures": "Adventure",
+    "animation": "Animation", "animated": "Animation", "biography": "Biography", "biographical": "Biography",
+    "comedy": "Comedy", "comedies": "Comedy", "crime": "Crime", "drama": "Drama", "dramas": "Drama",
+    "family": "Family", "fantasy": "Fantasy", "history": "History", "historical": "History",
+    "horror": "Horror", "music": "Music", "musical": "Musical", "musicals": "Musical",
+    "mystery": "Mystery", "mysteries": "Mystery", "romance": "Romance", "romantic": "Romance",
+    "sci-fi": "Sci-Fi", "scifi": "Sci-Fi", "sci fi": "Sci-Fi", "science fiction": "Sci-Fi",
+    "sport": "Sport", "sports": "Sport", "thriller": "Thriller", "thrillers": "Thriller",
+    "war": "War", "western": "Western", "westerns": "Western",
+}
+
+# superlative -> (sortBy, order)
+SORTS = {
+    "highest rated": ("Rating", "DESC"), "best rated": ("Rating", "DESC"), "top rated": ("Rating", "DESC"),
+    "best": ("Rating", "DESC"), "lowest rated": ("Rating", "ASC"), "worst rated": ("Rating", "ASC"),
+    "worst": ("Rating", "ASC"), "most voted": ("Votes", "DESC"), "most popular": ("Votes", "DESC"),
+    "highest grossing": ("Revenue", "DESC"), "top grossing": ("Revenue", "DESC"),
+    "most profitable": ("Revenue", "DESC"), "longest": ("Runtime", "DESC"), "shortest": ("Runtime", "ASC"),
+    "newest": ("Year", "DESC"), "latest": ("Year", "DESC"), "most recent": ("Year", "DESC"),
+    "oldest": ("Year", "ASC"),
+}
+
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "fifteen": 15, "twenty": 20,
+}
+
+FILLER = {
+    "show", "me", "list", "find", "get", "give", "display", "all", "the", "movies", "movie", "films",
+    "film", "please", "can", "could", "you", "i", "want", "to", "see", "some", "any", "that", "which",
+    "are", "were", "released", "made", "came", "out", "from", "a", "an", "and", "in", "of", "what",
+    "whose", "is", "there",
+}
+DIRECTOR_MARKERS = {"by", "directed"}
+ACTOR_MARKERS = {"starring", "featuring", "feature", "features", "with", "star", "stars"}
+
+NUM = r"(\d+|" + "|".join(NUMBER_WORDS) + r")"
+DECIMAL = r"(\d+(?:\.\d+)?)"
+YEAR = r"(?:the\s+year\s+)?(\d{4})"
+MINUTES = r"\s*(?:minutes|mins|min)\b"
+
+GET_PATTERN = re.compile(
+    r"^(?:please\s+)?(?:tell me about|show me|find|get|give me|what is|what's|describe|"
+    r"(?:show|give) me (?:info|information|details) (?:on|about|for))\s+(?:the\s+(?:movie|film)\s+)?(?P<title>.+)$",
+    re.IGNORECASE)
+DELETE_PATTERN = re.compile(
+    r"^(?:please\s+)?(?:delete|remove)\s+(?:the\s+)?(?:movie|film)?\s*(?P<title>.+)$", re.IGNORECASE)
+
+
+# "how many ..." and "average rating of ...", optionally ending in "per year/genre/director"
+COUNT_PATTERN = re.compile(r"^how many\s+(?P<rest>.+)$", re.IGNORECASE)
+STAT_PATTERN = re.compile(
+    r"^(?:what(?:\s+is|'s|\s+are)\s+)?(?:the\s+)?(?P<stat>average|mean|total|combined|highest|lowest|maximum|minimum)"
+    r"\s+(?P<field>rating|runtime|votes|revenue|box office)s?\s+(?:of|for|across)\s+(?P<rest>.+)$", re.IGNORECASE)
+STATS = {
+    "average": "avg", "mean": "avg", "total": "sum", "combined": "sum",
+    "highest": "max", "maximum": "max", "lowest": "min", "minimum": "min",
+}
+METRICS = {"rating": "Rating", "runtime": "Runtime", "votes": "Votes", "revenue": "Revenue", "box office": "Revenue"}
+
+
+def _number(text):
+    text = text.lower()
+    return NUMBER_WORDS[text] if text in NUMBER_WORDS else int(text)
+
+
+def _graphql_value(value):
+    # JSON string escaping is valid GraphQL string syntax
+    return json.dumps(value)
+
+
+def _resolve_title(storage, text, fuzzy=False):
+    """Return the catalog title for `text`, or None if it doesn't name a movie.
+
+    With `fuzzy`, a misspelled title resolves to the closest catalog title, but
+    only when that is unambiguous: the title has as many words as `text` and
+    clearly beats the runner-up. "inception 2" is not "Inception".
+    """
+    candidates = [text]
+    if text.lower().startswith("the "):
+        candidates.append(text[4:])
+    for candidate in candidates:
+        movie = storage.get_movie(candidate)
+        if movie:
+            return movie["Title"]
+    if fuzzy:
+        matches = storage.search_movies(text, 2, MATCH_MIN_SCORE)
+        if matches:
+            score, movie = matches[0]
+            runner_up = matches[1][0] if len(matches) > 1 else 0
+            if (len(title_words(movie["Title"])) == len(title_words(text))
+                    and score - runner_up >= FUZZY_TITLE_LEAD):
+                return movie["Title"]
+    return None
+
+
+def _get_query(title):
+    return f"query {{ getMovie(title: {_graphql_value(title)}) {{ {MOVIE_FIELDS} }} }}"
+
+
+def _names_someone(storage, arg, name):
+    """True if `name` matches a whole name (or whole words of one) in the catalog."""
+    field = {"directorContains": "Director", "actorContains": "Actors"}[arg]
+    with row_source("intent_probe"):
+        movies = storage.list_movies({arg: name}, limit=1)
+    return bool(movies) and re.search(r"\b" + re.escape(name) + r"\b", movies[0][field] or "", re.IGNORECASE) is not None
+
+
+def _list_query(filter, sortBy=None, order=None, limit=None):
+    args = []
+    if filter:
+        args.append("filter: {" + ", ".join(f"{k}: {_graphql_value(v)}" for k, v in filter.items()) + "}")
+    if sortBy:
+        args.append(f"sortBy: {_graphql_value(sortBy)}, order: {_graphql_value(order)}")
+    if limit:
+        args.append(f"limit: {limit}")
+    arguments = f"({', '.join(args)})" if args else ""
+    return f"query {{ listMovies{arguments} {{ {MOVIE_FIELDS} }} }}"
+
+
+def _parse_filter(storage, text):
+    """Parse the filters, sort and limit of a request into (filter, sort, limit).
+
+    Returns None if any part of the text is not understood.
+    """
+    filter, sort, limit = {}, None, None
+
+    def take(pattern, handler):
+        # Consume the first match of `pattern` from the remaining text.
+        nonlocal text
+        match = re.search(pattern, text, re.IGNORECASE)
+        if not match:
+            return False
+        handler(*match.groups())
+        text = f"{text[:match.start()]} {text[match.end():]}"
+        return True
+
+    # Year ranges
+    take(r"\bbetween\s+" + YEAR + r"\s+and\s+" + YEAR + r"\b",
+         lambda lo, hi: filter.update(minYear=int(lo), maxYear=int(hi)))
+    take(r"\bafter\s+" + YEAR + r"\b", lambda y: filter.update(minYear=int(y) + 1))
+    take(r"\bsince\s+" + YEAR + r"\b", lambda y: filter.update(minYear=int(y)))
+    take(r"\bbefore\s+" + YEAR + r"\b", lambda y: filter.update(maxYear=int(y) - 1))
+    take(r"\b(?:in|from|of)\s+" + YEAR + r"\b", lambda y: filter.update(exactYear=int(y)))
+    take(r"\b((?:19|20)\d{2})\b", lambda y: filter.update(exactYear=int(y)))
+
+    # Runtime bounds
+    take(r"\b(?:shorter than|less than|under|below)\s+(\d+)" + MINUTES,
+         lambda n: filter.update(maxRuntime=int(n)))
+    take(r"\b(?:longer than|more than|over|above)\s+(\d+)" + MINUTES,
+         lambda n: filter.update(minRuntime=int(n)))
+
+    # Minimum rating
+    take(r"\b(?:with\s+)?(?:an?\s+)?rating\s+(?:of\s+)?(?:greater than|higher than|more than|above|over|at least)\s+"
+         + DECIMAL, lambda r: filter.update(minRating=float(r)))
+    take(r"\brated\s+(?:above|over|higher than|more than|at least)\s+" + DECIMAL,
+         lambda r: filter.update(minRating=float(r)))
+    take(r"\brated\s+" + DECIMAL + r"\s+or\s+(?:higher|more|above|better)\b",
+         lambda r: filter.update(minRating=float(r)))
+
+    # Sorting and limits ("top 5 highest rated", "the 3 longest", "list 3 ...")
+    for phrase in sorted(SORTS, key=len, reverse=True):
+        if take(r"\b" + phrase + r"\b", lambda: None):
+            sort = SORTS[phrase]
+            break
+
+    def set_limit(n):
+        nonlocal limit
+        limit = _number(n)
+
+    if take(r"\b(?:top|first)\s+" + NUM + r"\b", set_limit) and sort is None:
+        sort = SORTS["highest rated"]
+    if limit is None:
+        take(r"\b(?:list|show|find|get|give)(?:\s+me)?(?:\s+the)?\s+" + NUM + r"\b", set_limit)
+    if limit is None:
+        take(r"^\s*(?:the\s+)?" + NUM + r"\b", set_limit)
+    if limit is None and sort is not None:
+        take(r"\btop\b", lambda: None)
+
+    # Whatever is left must be genres, people or filler words
+    words = re.findall(r"[\w'.-]+", text)
+    people = []  # [marker, name words]; marker is "director", "actor" or None when unmarked
+    current = None
+    i = 0
+    while i < len(words):
+        word = words[i].lower()
+        pair = f"{word} {words[i + 1].lower()}" if i + 1 < len(words) else None
+        if pair in GENRES or word in GENRES:
+            if "genreContains" in filter:
+                return None
+            filter["genreContains"] = GENRES[pair] if pair in GENRES else GENRES[word]
+            current = None
+            i += 2 if pair in GENRES else 1
+            continue
+        if word in DIRECTOR_MARKERS or word in ACTOR_MARKERS:
+            marker = "director" if word in DIRECTOR_MARKERS else "actor"
+            # "directed by" is one marker
+            if not (current and current[0] == marker and not current[1]):
+                current = [marker, []]
+                people.append(current)
+        elif word in FILLER:
+            current = None
+        else:
+            if current is None:
+                current = [None, []]
+                people.append(current)
+            current[1].append(words[i])
+        i += 1
+
+    for marker, name_words in people:
+        if not name_words:
+            continue
+        name = " ".join(name_words)
+        candidates = {"director": ["directorContains"], "actor": ["actorContains"]}.get(
+            marker, ["directorContains", "actorContains"])
+        for arg in candidates:
+            if arg not in filter and _names_someone(storage, arg, name):
+                filter[arg] = name
+                break
+        else:
+            return None
+
+    return filter, sort, limit
+
+
+def _parse_list(storage, text):
+    """Parse a listMovies request into its query, or None if any part is not understood."""
+    if not re.search(r"\b(?:movies|films)\b", text, re.IGNORECASE):
+        return None
+    parsed = _parse_filter(storage, text)
+    if parsed is None:
+        return None
+    filter, sort, limit = parsed
+    return _list_query(filter, *(sort or (None, None)), limit)
+
+
+def _parse_aggregate(storage, text):
+    """Parse a count/statistic request into an aggregateMovies query, or None."""
+    match = COUNT_PATTERN.match(text)
+    stat = field = None
+    if not match:
+        match = STAT_PATTERN.match(text)
+        if not match:
+            return None
+        stat, field = STATS[match.group("stat").lower()], METRICS[match.group("field").lower()]
+    rest = match.group("rest")
+    group = re.search(r"\s+(?:per|by|for each|each)\s+(year|genre|director)$", rest, re.IGNORECASE)
+    if group:
+        rest = rest[:group.start()]
+    parsed = _parse_filter(storage, rest)
+    if parsed is None or parsed[1] or parsed[2]:
+        return None
+    filter = parsed[0]
+
+    args = []
+    if filter:
+        args.append("filter: {" + ", ".join(f"{k}: {_graphql_value(v)}" for k, v in filter.items()) + "}")
+    if group:
+        args.append(f"groupBy: {group.group(1).capitalize()}")
+    if field:
+        args.append(f"metrics: [{field}]")
+    arguments = f"({', '.join(args)})" if args else ""
+    metrics = f" metrics {{ field {stat} }}" if field else ""
+    return f"query {{ aggregateMovies{arguments} {{ group count{metrics} }} }}"
+
+
+def parse_intent(storage, user_query):
+    """Return (intent, GraphQL query) for requests the rules understand, else None."""
+    text = re.sub(r"\s+", " ", user_query).strip().rstrip("?.!").strip()
+    if not text:
+        return None
+
+    match = DELETE_PATTERN.match(text)
+    if match:
+        title = _resolve_title(storage, match.group("title").strip())
+        if title:
+            return "deleteMovie", f"mutation {{ deleteMovie(title: {_graphql_value(title)}) {{ success message }} }}"
+        return None
+
+    query = _parse_aggregate(storage, text)
+    if query:
+        return "aggregateMovies", query
+
+    get_match = GET_PATTERN.match(text)
+    if get_match:
+        title = _resolve_title(storage, get_match.group("title").strip())
+        if title:
+            return "getMovie", _get_query(title)
+
+    query = _parse_list(storage, text)
+    if query:
+        return "listMovies", query
+
+    # Only now try the title as a misspelling, so e.g. "find horror movies" stays a list
+    if get_match:
+        title = _resolve_title(storage, get_match.group("title").strip(), fuzzy=True)
+        if title:
+            return "getMovie", _get_query(title)
+    return None
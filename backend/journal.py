@@ -0,0 +1,169 @@
+import json
+import os
+import threading
+
+from metrics import WRITE_BYTES, span
+
+
+class Journal:
+    """Append-only write-ahead log of catalog mutations.
+
+    Every mutation is appended as one compact JSON line, so a write costs the
+    size of the changed row rather than the whole catalog. A background thread
+    periodically compacts the journal into a fresh snapshot written by
+    `write_snapshot` (which must publish the snapshot atomically) and starts a
+    new, empty journal. On startup `replay` re-applies the journal over the
+    snapshot.
+
+    Records are idempotent ("put" carries the full row, "delete" the ids), so
+    replaying a record that already made it into the snapshot is harmless. A
+    "batch" record wraps the records of one multi-row mutation in a single
+    line, so a crash keeps either all of them or none.
+    """
+
+    def __init__(self, path, write_snapshot, fsync_every=1):
+        self.path = path
+        self._rotated_path = path + ".old"
+        self._write_snapshot = write_snapshot
+        self._fsync_every = fsync_every  # fsync after this many records; 0 leaves flushing to the OS
+        self._lock = threading.Lock()             # guards the journal file
+        self._compaction_lock = threading.Lock()  # one compaction at a time
+        # Held while compaction rotates the journal and takes the rows to snapshot.
+        # The storage sets it to its write lock, so a mutation that is journaled
+        # but not yet published can't fall between the two.
+        self.writer_lock = threading.Lock()
+        self._file = self._open(path)
+        self._unsynced = 0
+        self.records = 0  # records written since the last compaction
+        self._stop = threading.Event()
+
+    @staticmethod
+    def _open(path):
+        torn = False
+        if os.path.exists(path) and os.path.getsize(path):
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                torn = f.read(1) != b"\n"
+        f = open(path, "a", encoding="utf-8")
+        if torn:
+            # Terminate a torn final line so the next record starts on its own line.
+            f.write("\n")
+        return f
+
+    # --- Writing ---
+    def append(self, record):
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with span("journal_write"), self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self.records += 1
+            self._unsynced += 1
+            if self._fsync_every and self._unsynced >= self._fsync_every:
+                self._sync()
+        WRITE_BYTES.inc(len(line), target="journal")
+        return len(line)
+
+    def put(self, movie):
+        return self.append({"op": "put", "movie": movie})
+
+    def delete(self, ids):
+        return self.append({"op": "delete", "ids": ids})
+
+    def put_many(self, movies):
+        return self.append({"op": "batch", "records": [{"op": "put", "movie": m} for m in movies]})
+
+    def _sync(self):
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def flush(self):
+        with self._lock:
+            if self._unsynced:
+                self._sync()
+
+    # --- Recovery ---
+    def replay(self, store):
+        """Apply any journaled mutations to `store` and return how many were applied."""
+        applied = 0
+        for path in (self._rotated_path, self.path):
+            if not os.path.exists(path):
+                continue
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A torn write from a crash; only that record is lost.
+                        continue
+                    self._apply(store, record)
+                    applied += 1
+        self.records = applied
+        return applied
+
+    @classmethod
+    def _apply(cls, store, record):
+        if record["op"] == "put":
+            store.put(record["movie"])
+        elif record["op"] == "delete":
+            store.delete_ids(record["ids"])
+        elif record["op"] == "batch":
+            for inner in record["records"]:
+                cls._apply(store, inner)
+
+    # --- Compaction ---
+    def compact(self, snapshot_rows):
+        """Write a new snapshot and drop the journal records it covers.
+
+        `snapshot_rows` is called with the journal and `writer_lock` held and must
+        return a copy of the catalog that is safe to serialize after they are released.
+        """
+        with self._compaction_lock:
+            with self.writer_lock, self._lock:
+                if os.path.exists(self._rotated_path):
+                    # An earlier compaction died before finishing; keep its records
+                    # until a snapshot that includes them is on disk.
+                    self._file.close()
+                    with self._open(self._rotated_path) as rotated:
+                        with open(self.path, encoding="utf-8") as current:
+                            rotated.write(current.read())
+                    os.remove(self.path)
+                else:
+                    if self._unsynced:
+                        self._sync()
+                    self._file.close()
+                    os.replace(self.path, self._rotated_path)
+                self._file = self._open(self.path)
+                pending, self.records = self.records, 0
+                rows = snapshot_rows()
+            try:
+                self._write_snapshot(rows)
+            except Exception:
+                self.records += pending
+                raise
+            os.remove(self._rotated_path)
+
+    def start_background_compaction(self, snapshot_rows, interval=30.0, min_records=1):
+        """Flush pending fsyncs and compact every `interval` seconds from a daemon thread."""
+        def run():
+            while not self._stop.wait(interval):
+                # Any failure is reported and retried on the next tick: an exception
+                # escaping here would end compaction for the life of the process.
+                try:
+                    self.flush()
+                    if self.records >= min_records:
+                        self.compact(snapshot_rows)
+                except Exception as e:
+                    print(f"Journal compaction failed: {e!r}")
+
+        thread = threading.Thread(target=run, name="journal-compaction", daemon=True)
+        thread.start()
+        return thread
+
+    def close(self, snapshot_rows=None):
+        self._stop.set()
+        if snapshot_rows is not None and self.records:
+            self.compact(snapshot_rows)
+        with self._lock:
+            if self._unsynced:
+                self._sync()
+            self._file.close()
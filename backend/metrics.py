@@ -0,0 +1,251 @@
+import bisect
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from graphql.pyutils import is_awaitable
+from ariadne.types import Extension
+
+# --- Metrics ---
+# In-process counters and histograms, rendered in the Prometheus text format by
+# GET /metrics. Request stages are timed with `span(stage)`: every span is
+# observed in moviebot_stage_seconds and, while a request is being served, also
+# recorded in that request's trace, which the servers send back as a
+# Server-Timing header.
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    return "+Inf" if value == math.inf else repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels: counter.inc(amount, label=value, ...)."""
+
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.label_names = name, help, tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_labels(self.label_names, key)} {_number(value)}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels: histogram.observe(value, label=value, ...)."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name, self.help, self.label_names = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}  # label values -> [count per bucket (last is +Inf), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.label_names)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][i] += 1
+            entry[1] += value
+
+    def samples(self):
+        with self._lock:
+            values = {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+        for key, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                yield f"{self.name}_bucket{_labels(self.label_names, key, [('le', _number(bound))])} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.label_names, key)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.label_names, key)} {cumulative}"
+
+
+class Registry:
+    """The metrics rendered by /metrics, plus collectors for values read at scrape time."""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self.register(Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def collector(self, collect):
+        """Register `collect()`, returning [(name, kind, help, [(labels dict, value)])] at each scrape."""
+        self._collectors.append(collect)
+        return collect
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines += [f"# HELP {metric.name} {metric.help}", f"# TYPE {metric.name} {metric.kind}"]
+            lines += metric.samples()
+        for collect in self._collectors:
+            for name, kind, help, samples in collect():
+                lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+                lines += [f"{name}{_labels(labels, labels.values())} {_number(value)}" for labels, value in samples]
+        return "\n".join(lines) + "\n"
+
+
+# Rows counted by list queries are labelled with the source of the query, so
+# internal lookups (like the chatbot rules checking whether a name is a
+# director) don't pass for user queries.
+_row_source = contextvars.ContextVar("moviebot_row_source", default="query")
+
+
+@contextmanager
+def row_source(source):
+    """Label the rows counted inside the block with `source` instead of "query"."""
+    token = _row_source.set(source)
+    try:
+        yield
+    finally:
+        _row_source.reset(token)
+
+
+class RowCounter(Counter):
+    """Counter of rows by engine, labelled with the current row source."""
+
+    def __init__(self, name, help):
+        super().__init__(name, help, ("engine", "source"))
+
+    def inc(self, amount=1, engine=None):
+        super().inc(amount, engine=engine, source=_row_source.get())
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+HTTP_SECONDS = REGISTRY.histogram("moviebot_http_request_seconds", "HTTP request latency",
+                                  ("method", "endpoint", "status"))
+STAGE_SECONDS = REGISTRY.histogram("moviebot_stage_seconds", "Time spent in each request stage", ("stage",))
+RESOLVER_SECONDS = REGISTRY.histogram("moviebot_resolver_seconds", "Query/Mutation resolver latency", ("field",))
+LLM_ERRORS = REGISTRY.counter("moviebot_llm_errors_total", "Failed LLM calls", ("reason",))
+CHATBOT_REQUESTS = REGISTRY.counter("moviebot_chatbot_requests_total", "Chatbot requests by translation source",
+                                    ("source",))
+ROWS_SCANNED = REGISTRY.register(RowCounter("moviebot_rows_scanned_total", "Catalog rows examined by list queries"))
+ROWS_RETURNED = REGISTRY.register(RowCounter("moviebot_rows_returned_total", "Rows returned by list queries"))
+WRITE_BYTES = REGISTRY.counter("moviebot_write_bytes_total", "Bytes written for persistence", ("target",))
+
+
+def cache_collector(name, stats):
+    """Collector exposing a cache's stats() dict (hits/misses/size) under the label cache=name."""
+    def collect():
+        values = stats()
+        labels = {"cache": name}
+        return [
+            ("moviebot_cache_hits_total", "counter", "Cache hits", [(labels, values["hits"])]),
+            ("moviebot_cache_misses_total", "counter", "Cache misses", [(labels, values["misses"])]),
+            ("moviebot_cache_entries", "gauge", "Entries in the cache", [(labels, values["size"])]),
+        ]
+    return collect
+
+
+# --- Spans ---
+_trace = contextvars.ContextVar("moviebot_trace", default=None)
+
+
+def start_trace():
+    """Start recording the spans of the current request; pass the token to end_trace."""
+    return _trace.set([])
+
+
+def trace_spans():
+    """The current request's spans so far, as [(stage, seconds)]."""
+    return _trace.get() or []
+
+
+def end_trace(token):
+    """Stop recording and return the request's spans."""
+    spans = trace_spans()
+    _trace.reset(token)
+    return spans
+
+
+def record(stage, seconds):
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    spans = _trace.get()
+    if spans is not None:
+        spans.append((stage, seconds))
+
+
+@contextmanager
+def span(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+def server_timing(spans):
+    """Server-Timing header value for a request's spans; repeated stages are added up."""
+    totals = {}
+    for stage, seconds in spans:
+        totals[stage] = totals.get(stage, 0) + seconds
+    return ", ".join(f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in totals.items())
+
+
+class ResolverTiming(Extension):
+    """Ariadne extension timing the Query and Mutation resolvers.
+
+    Nested fields (Movie.Title etc.) only read dict keys and are left untimed.
+    """
+
+    def resolve(self, next_, obj, info, **kwargs):
+        if info.parent_type.name not in ("Query", "Mutation"):
+            return next_(obj, info, **kwargs)
+        field = f"{info.parent_type.name}.{info.field_name}"
+        start = time.perf_counter()
+        result = next_(obj, info, **kwargs)
+        if is_awaitable(result):
+            return self._finish_async(result, field, start)
+        self._finish(field, start)
+        return result
+
+    async def _finish_async(self, result, field, start):
+        try:
+            return await result
+        finally:
+            self._finish(field, start)
+
+    @staticmethod
+    def _finish(field, start):
+        seconds = time.perf_counter() - start
+        RESOLVER_SECONDS.observe(seconds, field=field)
+        spans = _trace.get()
+        if spans is not None:
+            spans.append((f"resolve_{field}", seconds))
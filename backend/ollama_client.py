@@ -0,0 +1,111 @@
+import asyncio
+import json
+
+import httpx
+
+
+class OllamaBusy(Exception):
+    """Raised when an LLM call waited longer than the queue timeout for a free slot."""
+
+
+class AsyncOllamaClient:
+    """Non-blocking Ollama chat client used by the ASGI app.
+
+    All calls share one keep-alive connection pool. At most `max_concurrency`
+    calls run upstream at once; the rest queue for up to `queue_timeout` seconds
+    and then fail with OllamaBusy. Identical payloads that are already in flight
+    share the same upstream call instead of starting another one.
+    """
+
+    def __init__(self, url, max_concurrency=4, timeout=120, queue_timeout=30):
+        self.url = url
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.upstream_calls = 0
+        self.coalesced = 0
+        self.waiting = 0
+        self._client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._inflight = {}  # serialized payload -> task running the upstream call
+
+    async def chat(self, payload):
+        """POST `payload` to the Ollama chat API and return the decoded JSON response."""
+        key = json.dumps(payload, sort_keys=True)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._call(payload))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        else:
+            self.coalesced += 1
+        # A disconnecting client must not cancel a call other requests are waiting on
+        return await asyncio.shield(task)
+
+    def _done(self, key, task):
+        self._inflight.pop(key, None)
+        if not task.cancelled():
+            task.exception()  # mark retrieved even if every waiter went away
+
+    async def _acquire(self):
+        # Not asyncio.wait_for: before Python 3.12 a timeout racing a successful
+        # acquire can drop the permit, lowering the limit for good. The acquire
+        # runs as its own task instead, and a permit it got after we gave up on it
+        # is handed back.
+        acquire = asyncio.ensure_future(self._semaphore.acquire())
+        self.waiting += 1
+        try:
+            done, _ = await asyncio.wait({acquire}, timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            self._abandon(acquire)
+            raise
+        finally:
+            self.waiting -= 1
+        if not done:
+            self._abandon(acquire)
+            raise OllamaBusy(f"No free LLM slot after {self.queue_timeout:g}s")
+
+    def _abandon(self, acquire):
+        acquire.cancel()
+        acquire.add_done_callback(
+            lambda task: None if task.cancelled() or task.exception() else self._semaphore.release())
+
+    async def _call(self, payload):
+        await self._acquire()
+        try:
+            self.upstream_calls += 1
+            response = await self._client.post(self.url, json=payload)
+            response.raise_for_status()
+            return response.json()
+        finally:
+            self._semaphore.release()
+
+    async def chat_stream(self, payload):
+        """Yield the message content of a streamed chat response piece by piece.
+
+        Streamed calls take a slot like any other call but are never coalesced.
+        """
+        await self._acquire()
+        try:
+            self.upstream_calls += 1
+            async with self._client.stream("POST", self.url, json={**payload, "stream": True}) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if line:
+                        yield json.loads(line).get("message", {}).get("content", "")
+        finally:
+            self._semaphore.release()
+
+    def stats(self):
+        return {
+            "maxConcurrency": self.max_concurrency,
+            "inFlight": len(self._inflight),
+            "waiting": self.waiting,
+            "upstreamCalls": self.upstream_calls,
+            "coalesced": self.coalesced,
+        }
+
+    async def aclose(self):
+        await self._client.aclose()
@@ -0,0 +1,72 @@
+import base64
+import heapq
+import json
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def sort_key(sortBy):
+    return lambda m: m.get(sortBy) or 0
+
+
+def top_k(movies, sortBy, order, limit):
+    """First `limit` movies of sorted(movies, key=sort_key(sortBy), reverse=DESC), in O(n log k)."""
+    key = sort_key(sortBy)
+    if order and order.upper() == "DESC":
+        return heapq.nlargest(limit, movies, key=key)
+    return heapq.nsmallest(limit, movies, key=key)
+
+
+# --- Cursor pagination ---
+# A cursor is the (sort value, catalog position) of the last row on a page, so
+# the next page is "every matching row after that one" and stays correct when
+# movies are added or deleted between requests.
+
+def encode_cursor(value, position):
+    return base64.urlsafe_b64encode(json.dumps([value, position]).encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        value, position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise Exception(f"Invalid cursor '{cursor}'.")
+    return value, position
+
+
+def paginate(movies, position, sortBy=None, order="ASC", first=None, after=None):
+    """Return one page of `movies` as a MovieConnection dict.
+
+    `position` maps a movie to its catalog position, which breaks ties the same
+    way the stable sort in listMovies does.
+    """
+    first = DEFAULT_PAGE_SIZE if first is None else max(0, min(first, MAX_PAGE_SIZE))
+    value = sort_key(sortBy) if sortBy else (lambda m: 0)
+    descending = bool(sortBy) and bool(order) and order.upper() == "DESC"
+
+    if after is not None:
+        after_value, after_position = decode_cursor(after)
+        if descending:
+            movies = [m for m in movies if value(m) < after_value
+                      or (value(m) == after_value and position(m) > after_position)]
+        else:
+            movies = [m for m in movies if value(m) > after_value
+                      or (value(m) == after_value and position(m) > after_position)]
+
+    # Fetch one extra row to learn whether another page follows.
+    if descending:
+        page = heapq.nlargest(first + 1, movies, key=lambda m: (value(m), -position(m)))
+    else:
+        page = heapq.nsmallest(first + 1, movies, key=lambda m: (value(m), position(m)))
+    has_next = len(page) > first
+    page = page[:first]
+
+    edges = [{"cursor": encode_cursor(value(m), position(m)), "node": m} for m in page]
+    return {
+        "edges": edges,
+        "pageInfo": {
+            "hasNextPage": has_next,
+            "endCursor": edges[-1]["cursor"] if edges else None,
+        },
+    }
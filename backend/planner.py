@@ -0,0 +1,95 @@
+# --- listMovies filter planning ---
+# Every MovieFilterInput predicate can be answered from one of the store's
+# indexes. The planner estimates how many rows each index would yield, drives
+# the query from the most selective one and checks the remaining predicates in
+# a single pass over those candidates.
+
+from metrics import ROWS_SCANNED
+
+# filter argument -> indexed text field
+TEXT_FILTERS = {
+    "genreContains": "Genre",
+    "directorContains": "Director",
+    "actorContains": "Actors",
+}
+
+# filter argument -> (numeric field, comparison)
+RANGE_FILTERS = {
+    "minRating": ("Rating", ">="),
+    "minYear": ("Year", ">="),
+    "maxYear": ("Year", "<="),
+    "exactYear": ("Year", "=="),
+    "minRuntime": ("Runtime", ">="),
+    "maxRuntime": ("Runtime", "<="),
+}
+
+
+def _range_check(field, op, value):
+    if op == ">=":
+        return lambda m: bool(m.get(field)) and m[field] >= value
+    if op == "<=":
+        return lambda m: bool(m.get(field)) and m[field] <= value
+    return lambda m: m.get(field) == value
+
+
+def _text_check(field, term):
+    term = term.lower()
+    return lambda m: bool(m.get(field)) and term in m[field].lower()
+
+
+def plan(store, filter):
+    """Return (access paths, checks) for a filter.
+
+    Each access path is (estimated rows, callable returning candidate ids);
+    every candidate must pass all checks.
+    """
+    paths = []
+    checks = []
+
+    if "titleContains" in filter:
+        term = filter["titleContains"].lower()
+        ids = store.match_title(term)
+        if ids is not None:
+            paths.append((len(ids), lambda ids=ids: ids))
+        checks.append(lambda m: bool(m.get("Title")) and term in m["Title"].lower())
+
+    for arg, field in TEXT_FILTERS.items():
+        if arg not in filter:
+            continue
+        ids = store.match_text(field, filter[arg])
+        if ids is None:
+            checks.append(_text_check(field, filter[arg]))
+        else:
+            paths.append((len(ids), lambda ids=ids: ids))
+            checks.append(lambda m, ids=ids: m["Ids"] in ids)
+
+    # Fold all bounds on the same field into one range so e.g. minYear/maxYear is a single bisect.
+    bounds = {}
+    for arg, (field, op) in RANGE_FILTERS.items():
+        if arg not in filter:
+            continue
+        value = filter[arg]
+        checks.append(_range_check(field, op, value))
+        lo, hi = bounds.get(field, (None, None))
+        if op in (">=", "=="):
+            lo = value if lo is None else max(lo, value)
+        if op in ("<=", "=="):
+            hi = value if hi is None else min(hi, value)
+        bounds[field] = (lo, hi)
+    for field, (lo, hi) in bounds.items():
+        paths.append((store.count_range(field, lo, hi),
+                      lambda field=field, lo=lo, hi=hi: store.range_ids(field, lo, hi)))
+
+    return paths, checks
+
+
+def select_movies(store, filter):
+    """Return the movies matching a MovieFilterInput, in catalog order."""
+    paths, checks = plan(store, filter)
+    if paths:
+        _, candidate_ids = min(paths, key=lambda path: path[0])
+        candidates = store.rows(candidate_ids())
+    else:
+        candidates = store
+    ROWS_SCANNED.inc(len(candidates), engine="index")
+    return [m for m in candidates if all(check(m) for check in checks)]
@@ -0,0 +1,92 @@
+import os
+import sys
+import threading
+import time
+
+# --- Sampling profiler ---
+# A background thread that samples every other thread's Python stack at a
+# fixed interval and counts identical stacks. It is off until started (at
+# runtime through /debug/profiler) and costs nothing while stopped. Stacks are
+# reported in the "collapsed" format (root;...;leaf count), which flamegraph.pl
+# and speedscope read directly.
+
+MAX_DEPTH = 64
+# Leaf frames of threads that are parked rather than working
+IDLE_FRAMES = {"threading.py:wait", "selectors.py:select", "socket.py:accept", "queue.py:get"}
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class SamplingProfiler:
+    def __init__(self):
+        self.interval = 0.01
+        self.samples = 0
+        self.started = None
+        self._stacks = {}  # (frame names, root first) -> times seen
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self, interval=0.01, reset=True):
+        """Start sampling every `interval` seconds; already collected stacks are dropped unless reset=False."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            if reset:
+                self._stacks, self.samples = {}, 0
+            self.interval = max(0.001, float(interval))
+            self.started = time.time()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, frame in frames.items():
+                    if thread_id == own:
+                        continue
+                    stack = []
+                    while frame is not None and len(stack) < MAX_DEPTH:
+                        stack.append(_frame_name(frame))
+                        frame = frame.f_back
+                    key = tuple(reversed(stack))
+                    self._stacks[key] = self._stacks.get(key, 0) + 1
+                self.samples += 1
+
+    def collapsed(self, idle=False):
+        """Sampled stacks in collapsed format, most frequent first.
+
+        Threads parked in a wait (idle workers, the journal compaction timer)
+        are left out unless `idle` is set.
+        """
+        with self._lock:
+            stacks = sorted(self._stacks.items(), key=lambda item: -item[1])
+        lines = [f"{';'.join(stack)} {count}" for stack, count in stacks
+                 if idle or stack[-1] not in IDLE_FRAMES]
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def stats(self):
+        return {
+            "running": self.running,
+            "interval": self.interval,
+            "samples": self.samples,
+            "stacks": len(self._stacks),
+            "started": self.started,
+        }
@@ -0,0 +1,112 @@
+import re
+
+from graphql import parse, print_ast
+
+from intents import MOVIE_FIELDS
+from query_cache import normalize_query
+
+# --- Chatbot prompt ---
+# Everything except the user's request is built once at import: the instructions,
+# a minified schema and the few-shot examples. Sent as the same system message on
+# every call, it lets Ollama reuse the already evaluated prefix (its KV cache), so
+# only the short user message is evaluated per request.
+
+# Cursor pagination, title search and batch mutations are for API clients; the LLM needs
+# only listMovies, getMovie, aggregateMovies and the single-movie mutations.
+SKIP_TYPES = {"MovieEdge", "PageInfo", "MovieConnection", "MovieChangeInput", "RowError", "BatchPayload",
+              "MovieMatch"}
+SKIP_FIELDS = {"listMoviesConnection", "searchMovies", "createMovies", "updateMovies", "deleteMovies"}
+
+INSTRUCTIONS = f"""You convert requests about a movie database into one GraphQL query or mutation for the schema below.
+Reply with ONLY the GraphQL, no explanation or markdown.
+- One movie by title ("show me/find/tell me about X"): getMovie. Several movies: listMovies with filter.
+- Delete: deleteMovie. Update: updateMovie. Add: createMovie.
+- Sorting: sortBy and order. A number of results: limit.
+- Counts, averages, totals, minimums or maximums ("how many", "average rating", "per year"): aggregateMovies.
+- Copy titles as written: getMovie with fuzzy: true matches misspelled titles.
+- getMovie, listMovies, createMovie and updateMovie must select at least: {MOVIE_FIELDS}"""
+
+EXAMPLES = [
+    ("show me all movies", "query { listMovies { Ids Title Year } }"),
+    ("find movies with rating greater than 8.5", "query { listMovies(filter: {minRating: 8.5}) { Title Rating } }"),
+    ("List 3 action movies", 'query { listMovies(filter: {genreContains: "Action"}, limit: 3) { Title Genre } }'),
+    ("Show me movies released after 2020", "query { listMovies(filter: {minYear: 2021}) { Title Year } }"),
+    ("List movies from before the year 2000", "query { listMovies(filter: {maxYear: 1999}) { Title Year } }"),
+    ("tell me about the movie Prometheus", f'query {{ getMovie(title: "Prometheus", fuzzy: true) {{ {MOVIE_FIELDS} }} }}'),
+    ("delete the movie Suicide Squad", 'mutation { deleteMovie(title: "Suicide Squad") { success message } }'),
+    ("update the movie Aryaman with year 2025",
+     f'mutation {{ updateMovie(title: "Aryaman", input: {{ Year: 2025 }}) {{ {MOVIE_FIELDS} }} }}'),
+    ("show me the top 5 highest rated movies",
+     f'query {{ listMovies(sortBy: "Rating", order: "DESC", limit: 5) {{ {MOVIE_FIELDS} }} }}'),
+    ("find the movie the dark knigth", f'query {{ getMovie(title: "the dark knigth", fuzzy: true) {{ {MOVIE_FIELDS} }} }}'),
+    ("find all Christopher Nolan movies",
+     f'query {{ listMovies(filter: {{directorContains: "Christopher Nolan"}}) {{ {MOVIE_FIELDS} }} }}'),
+    ("get movies that feature Leonardo DiCaprio",
+     f'query {{ listMovies(filter: {{actorContains: "Leonardo DiCaprio"}}) {{ {MOVIE_FIELDS} }} }}'),
+    ("list comedy movies released in 2015",
+     f'query {{ listMovies(filter: {{genreContains: "Comedy", exactYear: 2015}}) {{ {MOVIE_FIELDS} }} }}'),
+    ("show me movies shorter than 100 minutes",
+     f'query {{ listMovies(filter: {{maxRuntime: 100}}) {{ {MOVIE_FIELDS} }} }}'),
+    ("what is the average rating of Christopher Nolan movies",
+     'query { aggregateMovies(filter: {directorContains: "Christopher Nolan"}, metrics: [Rating]) '
+     '{ group count metrics { field avg } } }'),
+    ("how many comedies per year",
+     'query { aggregateMovies(filter: {genreContains: "Comedy"}, groupBy: Year) { group count } }'),
+]
+
+_PUNCTUATION_SPACE = re.compile(r"\s*([{}()\[\]:,!=])\s*")
+
+
+def minify_sdl(sdl):
+    """One line per type, no optional whitespace, without the types/fields the LLM doesn't need."""
+    lines = []
+    for definition in parse(sdl).definitions:
+        if definition.name.value in SKIP_TYPES:
+            continue
+        if definition.kind == "enum_type_definition":
+            values = " ".join(value.name.value for value in definition.values)
+            lines.append(f"enum {definition.name.value}{{{values}}}")
+            continue
+        keyword = "input" if definition.kind == "input_object_type_definition" else "type"
+        fields = " ".join(_PUNCTUATION_SPACE.sub(r"\1", print_ast(field)) for field in definition.fields
+                          if field.name.value not in SKIP_FIELDS)
+        lines.append(f"{keyword} {definition.name.value}{{{fields}}}")
+    return "\n".join(lines)
+
+
+def format_examples(examples):
+    return "\n".join(f"Q: {question}\nA: {answer}" for question, answer in examples)
+
+
+def build_system_prompt(sdl, include_examples=True):
+    parts = [INSTRUCTIONS, "Schema:\n" + minify_sdl(sdl)]
+    if include_examples:
+        parts.append("Examples:\n" + format_examples(EXAMPLES))
+    return "\n\n".join(parts)
+
+
+def _words(text):
+    return set(normalize_query(text).split())
+
+
+_EXAMPLE_WORDS = [_words(question) for question, _ in EXAMPLES]
+
+
+def select_examples(user_query, k):
+    """The k examples whose questions share the most words with `user_query` (Jaccard similarity)."""
+    words = _words(user_query)
+    scores = [len(words & other) / (len(words | other) or 1) for other in _EXAMPLE_WORDS]
+    best = sorted(range(len(EXAMPLES)), key=lambda i: -scores[i])[:k]
+    return [EXAMPLES[i] for i in sorted(best)]
+
+
+def chat_messages(system_prompt, user_query, example_count=0):
+    """System + user messages for Ollama's chat API.
+
+    With example_count > 0 the system prompt is expected to have no examples;
+    the closest examples go in the user message instead, after the cached prefix.
+    """
+    content = user_query
+    if example_count:
+        content = f"{format_examples(select_examples(user_query, example_count))}\nQ: {user_query}\nA:"
+    return [{"role": "system", "content": system_prompt}, {"role": "user", "content": content}]
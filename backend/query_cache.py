@@ -0,0 +1,94 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# Punctuation is dropped unless it sits between digits, so "7.5" stays distinct from "75".
+_PUNCTUATION = re.compile(r"(?<!\d)[^\w\s]|[^\w\s](?!\d)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(text):
+    """Case-fold and strip punctuation/extra whitespace so trivially different phrasings share a key."""
+    text = _PUNCTUATION.sub(" ", text.casefold())
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+class TranslationCache:
+    """LRU + TTL cache from normalized chatbot questions to the GraphQL generated for them.
+
+    If `path` is given, entries are loaded from it on startup and written back
+    (atomically) whenever a new translation is stored.
+    """
+
+    def __init__(self, max_size=1024, ttl=24 * 60 * 60, path=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (graphql query, expiry timestamp)
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self._load()
+
+    def get(self, user_query):
+        key = normalize_query(user_query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, user_query, graphql_query):
+        key = normalize_query(user_query)
+        with self._lock:
+            self._entries[key] = (graphql_query, time.time() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            if self.path:
+                self._save()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self.path:
+                self._save()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxSize": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": self.hits / lookups if lookups else 0.0,
+            }
+
+    # --- Persistence ---
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable translation cache {self.path}: {e}")
+            return
+        now = time.time()
+        for key, graphql_query, expires in entries[-self.max_size:]:
+            if expires > now:
+                self._entries[key] = (graphql_query, expires)
+
+    def _save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump([[key, q, expires] for key, (q, expires) in self._entries.items()], f)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,111 @@
+import sys
+import threading
+from collections import OrderedDict
+
+
+SIZE_SAMPLE = 32  # items of a longer list that are measured to estimate its size
+
+
+def estimate_size(value):
+    """Approximate bytes held by a result: its lists, tuples and dicts and everything in them.
+
+    Long lists are extrapolated from an evenly spaced sample of their items, so
+    sizing a 100k-row result costs about as much as sizing 32 rows. Lazy
+    snapshot rows count as their own small object; their fields live in the
+    memory-mapped file.
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        return size + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        if len(value) > SIZE_SAMPLE:
+            step = len(value) / SIZE_SAMPLE
+            sample = sum(estimate_size(value[int(i * step)]) for i in range(SIZE_SAMPLE))
+            return size + sample * len(value) // SIZE_SAMPLE
+        return size + sum(map(estimate_size, value))
+    return size
+
+
+def filter_key(filter):
+    return tuple(sorted((filter or {}).items()))
+
+
+def list_key(filter, sortBy, order, limit):
+    """Cache key for a listMovies call; equivalent argument spellings share a key."""
+    order = ("DESC" if order and order.upper() == "DESC" else "ASC") if sortBy else None
+    return ("listMovies", filter_key(filter), sortBy, order, limit)
+
+
+def aggregate_key(filter, groupBy, fields):
+    return ("aggregateMovies", filter_key(filter), groupBy, tuple(fields))
+
+
+class ResultCache:
+    """LRU cache of storage query results, tied to the storage's data version.
+
+    Every lookup passes the current version; when it differs from the version
+    the cached results were computed at, the whole cache is dropped, so results
+    never outlive the data they came from. Size is bounded by `max_bytes`, as
+    estimated by `estimate_size` for each result and key. That includes the
+    rows, which are usually shared with the store.
+    """
+
+    def __init__(self, max_bytes=64 * 2 ** 20):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._version = None
+        self._entries = OrderedDict()  # key -> (result, size)
+        self._lock = threading.Lock()
+
+    def _sync_version(self, version):
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self.bytes = 0
+            self._version = version
+
+    def get_or_compute(self, version, key, compute):
+        """Return the cached result for `key` at `version`, or compute and cache it."""
+        with self._lock:
+            self._sync_version(version)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        result = compute()
+
+        size = estimate_size(result) + estimate_size(key)
+        with self._lock:
+            # Skip the store if the data changed while computing, or if it would never fit
+            if version == self._version and size <= self.max_bytes and key not in self._entries:
+                self._entries[key] = (result, size)
+                self.bytes += size
+                while self.bytes > self.max_bytes:
+                    _, (_, evicted) = self._entries.popitem(last=False)
+                    self.bytes -= evicted
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "bytes": self.bytes,
+                "maxBytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
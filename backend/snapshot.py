@@ -0,0 +1,211 @@
+import math
+import mmap
+import os
+import struct
+from array import array
+from collections.abc import Mapping
+
+# --- Binary snapshot format ---
+# header:    magic, format version, row count, column count
+# directory: one entry per column (name, kind, data offset, dictionary size,
+#            dictionary offsets offset, dictionary blob offset)
+# data:      int64 / float64 columns are fixed-width arrays; text columns are
+#            uint32 codes into a per-column dictionary of distinct UTF-8 strings.
+# All sections are 8-byte aligned so they can be viewed in place through mmap.
+
+MAGIC = b"MOVB"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sIQI")
+COLUMN = struct.Struct("<16sBQQQQ")
+
+INT, FLOAT, TEXT = 0, 1, 2
+INT_NULL = -(2 ** 63)
+TEXT_NULL = 0xFFFFFFFF
+
+COLUMNS = (
+    ("Ids", INT),
+    ("Title", TEXT),
+    ("Genre", TEXT),
+    ("Description", TEXT),
+    ("Director", TEXT),
+    ("Actors", TEXT),
+    ("Year", INT),
+    ("Runtime", INT),
+    ("Rating", FLOAT),
+    ("Votes", INT),
+    ("Revenue", FLOAT),
+)
+
+
+def _pad(buf):
+    buf.extend(b"\0" * (-len(buf) % 8))
+
+
+def write_snapshot(path, movies):
+    """Write movies to `path` in the binary snapshot format, replacing it atomically."""
+    movies = list(movies)
+    directory_size = HEADER.size + COLUMN.size * len(COLUMNS)
+    body = bytearray()
+    entries = []
+    for name, kind in COLUMNS:
+        values = [m.get(name) for m in movies]
+        dict_count = dict_index_off = blob_off = 0
+        if kind == INT:
+            data = array("q", (INT_NULL if v is None else int(v) for v in values))
+        elif kind == FLOAT:
+            data = array("d", (math.nan if v is None else float(v) for v in values))
+        else:
+            codes = {}
+            data = array("I", (TEXT_NULL if v is None else codes.setdefault(v, len(codes)) for v in values))
+            encoded = [s.encode("utf-8") for s in codes]
+            offsets = array("Q", [0])
+            for s in encoded:
+                offsets.append(offsets[-1] + len(s))
+            dict_count = len(encoded)
+            dict_index_off = directory_size + len(body)
+            body.extend(offsets.tobytes())
+            _pad(body)
+            blob_off = directory_size + len(body)
+            body.extend(b"".join(encoded))
+            _pad(body)
+        data_off = directory_size + len(body)
+        body.extend(data.tobytes())
+        _pad(body)
+        entries.append(COLUMN.pack(name.encode(), kind, data_off, dict_count, dict_index_off, blob_off))
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(movies), len(COLUMNS)))
+        f.write(b"".join(entries))
+        f.write(body)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+# --- Snapshot generations ---
+# The server never rewrites the snapshot it has mapped: on Windows a
+# memory-mapped file can be neither replaced nor deleted. Each compaction
+# writes the next generation instead ("imdb.bin", then "imdb.bin.1",
+# "imdb.bin.2", ...). Startup opens the newest one, and older generations are
+# deleted as soon as nothing maps them any more.
+
+def snapshot_generations(path):
+    """(generation, file) of every existing generation of `path`, newest first."""
+    directory, base = os.path.split(path)
+    found = []
+    for name in os.listdir(directory or "."):
+        suffix = name[len(base) + 1:]
+        if name == base:
+            found.append((0, path))
+        elif name.startswith(base + ".") and suffix.isdigit():
+            found.append((int(suffix), os.path.join(directory, name)))
+    return sorted(found, reverse=True)
+
+
+def latest_snapshot(path):
+    """The newest generation of `path`, or None if there is none."""
+    generations = snapshot_generations(path)
+    return generations[0][1] if generations else None
+
+
+def remove_old_snapshots(path, keep):
+    """Delete the generations of `path` other than `keep`, skipping files still mapped (Windows)."""
+    for _, file in snapshot_generations(path):
+        if file != keep:
+            try:
+                os.remove(file)
+            except OSError:
+                pass
+
+
+def write_snapshot_generation(path, movies):
+    """Write `movies` as the next generation of `path`, remove the old ones and return the new file."""
+    generations = snapshot_generations(path)
+    new_path = f"{path}.{generations[0][0] + 1}" if generations else path
+    write_snapshot(new_path, movies)
+    remove_old_snapshots(path, keep=new_path)
+    return new_path
+
+
+class MovieSnapshot:
+    """Read-only, memory-mapped view of a binary snapshot.
+
+    Opening only parses the header; numeric columns are exposed as zero-copy
+    memoryviews and text is decoded on access.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self._count, ncols = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} movie snapshot")
+        view = memoryview(self._mmap)
+        self._columns = {}
+        for i in range(ncols):
+            raw_name, kind, data_off, dict_count, dict_index_off, blob_off = COLUMN.unpack_from(
+                self._mmap, HEADER.size + i * COLUMN.size)
+            name = raw_name.rstrip(b"\0").decode()
+            fmt, width = {INT: ("q", 8), FLOAT: ("d", 8), TEXT: ("I", 4)}[kind]
+            data = view[data_off:data_off + width * self._count].cast(fmt)
+            dictionary = None
+            if kind == TEXT:
+                offsets = view[dict_index_off:dict_index_off + 8 * (dict_count + 1)].cast("Q")
+                dictionary = (offsets, blob_off)
+            self._columns[name] = (kind, data, dictionary)
+        self.fields = tuple(self._columns)
+
+    def __len__(self):
+        return self._count
+
+    def column(self, name):
+        """Raw column values: ints/floats for numeric columns, dictionary codes for text."""
+        return self._columns[name][1]
+
+    def text(self, name, code):
+        if code == TEXT_NULL:
+            return None
+        offsets, blob_off = self._columns[name][2]
+        return self._mmap[blob_off + offsets[code]:blob_off + offsets[code + 1]].decode("utf-8")
+
+    def values(self, name):
+        """All values of a numeric column as Python numbers, with None for nulls."""
+        kind, data, _ = self._columns[name]
+        if kind == INT:
+            return [None if v == INT_NULL else v for v in data.tolist()]
+        return [None if math.isnan(v) else v for v in data.tolist()]
+
+    def value(self, name, i):
+        kind, data, _ = self._columns[name]
+        v = data[i]
+        if kind == INT:
+            return None if v == INT_NULL else v
+        if kind == FLOAT:
+            return None if math.isnan(v) else v
+        return self.text(name, v)
+
+    def rows(self):
+        return [SnapshotRow(self, i) for i in range(self._count)]
+
+
+class SnapshotRow(Mapping):
+    """A movie row backed by a MovieSnapshot; fields are decoded when read."""
+
+    __slots__ = ("_snapshot", "_i")
+
+    def __init__(self, snapshot, i):
+        self._snapshot = snapshot
+        self._i = i
+
+    def __getitem__(self, key):
+        if key not in self._snapshot._columns:
+            raise KeyError(key)
+        return self._snapshot.value(key, self._i)
+
+    def __iter__(self):
+        return iter(self._snapshot.fields)
+
+    def __len__(self):
+        return len(self._snapshot.fields)
@@ -0,0 +1,343 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from aggregate import GROUP_FIELDS, METRIC_FIELDS, accumulate, aggregate_rows
+from metrics import ROWS_RETURNED, span
+from paging import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, encode_cursor
+from titles import SEARCH_MIN_SCORE, TitleIndex
+
+FIELDS = ("Ids", "Title", "Genre", "Description", "Director", "Actors",
+          "Year", "Runtime", "Rating", "Votes", "Revenue")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS movies (
+    Ids INTEGER PRIMARY KEY AUTOINCREMENT,
+    Title TEXT NOT NULL,
+    Genre TEXT,
+    Description TEXT,
+    Director TEXT,
+    Actors TEXT,
+    Year INTEGER,
+    Runtime INTEGER,
+    Rating REAL,
+    Votes INTEGER,
+    Revenue REAL
+);
+CREATE INDEX IF NOT EXISTS idx_movies_title ON movies(lower(Title));
+CREATE INDEX IF NOT EXISTS idx_movies_year ON movies(Year);
+CREATE INDEX IF NOT EXISTS idx_movies_rating ON movies(Rating);
+CREATE INDEX IF NOT EXISTS idx_movies_runtime ON movies(Runtime);
+
+-- Trigram full-text index: substring matches on text fields without scanning the table.
+CREATE VIRTUAL TABLE IF NOT EXISTS movies_fts USING fts5(
+    Genre, Description, Director, Actors,
+    content='movies', content_rowid='Ids', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS movies_ai AFTER INSERT ON movies BEGIN
+    INSERT INTO movies_fts(rowid, Genre, Description, Director, Actors)
+    VALUES (new.Ids, new.Genre, new.Description, new.Director, new.Actors);
+END;
+CREATE TRIGGER IF NOT EXISTS movies_ad AFTER DELETE ON movies BEGIN
+    INSERT INTO movies_fts(movies_fts, rowid, Genre, Description, Director, Actors)
+    VALUES ('delete', old.Ids, old.Genre, old.Description, old.Director, old.Actors);
+END;
+-- Bumped by every change, including ones made by other processes, so
+-- cached query results can tell when they are stale.
+CREATE TABLE IF NOT EXISTS movies_version (version INTEGER NOT NULL);
+INSERT INTO movies_version SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM movies_version);
+CREATE TRIGGER IF NOT EXISTS movies_version_ai AFTER INSERT ON movies BEGIN
+    UPDATE movies_version SET version = version + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS movies_version_ad AFTER DELETE ON movies BEGIN
+    UPDATE movies_version SET version = version + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS movies_version_au AFTER UPDATE ON movies BEGIN
+    UPDATE movies_version SET version = version + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS movies_au AFTER UPDATE ON movies BEGIN
+    INSERT INTO movies_fts(movies_fts, rowid, Genre, Description, Director, Actors)
+    VALUES ('delete', old.Ids, old.Genre, old.Description, old.Director, old.Actors);
+    INSERT INTO movies_fts(rowid, Genre, Description, Director, Actors)
+    VALUES (new.Ids, new.Genre, new.Description, new.Director, new.Actors);
+END;
+"""
+
+# filter argument -> (column, SQL predicate). Numeric bounds mirror the in-memory
+# `m.get(field) and m[field] >= value` checks, so NULL and 0 never match.
+RANGE_PREDICATES = {
+    "minRating": ("Rating", "Rating IS NOT NULL AND Rating != 0 AND Rating >= ?"),
+    "minYear": ("Year", "Year IS NOT NULL AND Year != 0 AND Year >= ?"),
+    "maxYear": ("Year", "Year IS NOT NULL AND Year != 0 AND Year <= ?"),
+    "exactYear": ("Year", "Year = ?"),
+    "minRuntime": ("Runtime", "Runtime IS NOT NULL AND Runtime != 0 AND Runtime >= ?"),
+    "maxRuntime": ("Runtime", "Runtime IS NOT NULL AND Runtime != 0 AND Runtime <= ?"),
+}
+
+TEXT_PREDICATES = {
+    "genreContains": "Genre",
+    "directorContains": "Director",
+    "actorContains": "Actors",
+}
+
+
+def _row(row):
+    return dict(zip(FIELDS, row))
+
+
+class SQLiteStorage:
+    """Storage backed by a SQLite database in WAL mode.
+
+    Filtering, sorting and limits are translated into parameterized SQL, so
+    several worker processes can share one database. Each thread gets its own
+    connection.
+
+    Title matching uses SQLite's lower(), which only folds ASCII letters, and
+    the text filters use a trigram FTS5 index (terms shorter than 3 characters
+    fall back to instr()). Fuzzy title search uses an in-process TitleIndex,
+    rebuilt on the first search after the data version changes.
+    """
+
+    def __init__(self, path, initial_movies=None):
+        self.path = path
+        self._local = threading.local()
+        self._titles = None  # (version, TitleIndex, {Ids: Title})
+        self._titles_lock = threading.Lock()
+        self._conn().executescript(SCHEMA)
+        if initial_movies is not None and len(self) == 0:
+            with self._transaction() as conn:
+                conn.executemany(
+                    f"INSERT INTO movies ({', '.join(FIELDS)}) VALUES ({', '.join('?' * len(FIELDS))})",
+                    ([m.get(f) for f in FIELDS] for m in initial_movies()),
+                )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so a read-then-write
+        # (e.g. find the movie, then update it) can't interleave with another writer.
+        conn = self._conn()
+        with span("sqlite_write"):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM movies").fetchone()[0]
+
+    @property
+    def version(self):
+        return self._conn().execute("SELECT version FROM movies_version").fetchone()[0]
+
+    # --- Query translation ---
+    def _where(self, filter):
+        clauses, params = [], []
+        if not filter:
+            return "", params
+        if "titleContains" in filter:
+            clauses.append("instr(lower(Title), lower(?)) > 0")
+            params.append(filter["titleContains"])
+        for arg, (_, predicate) in RANGE_PREDICATES.items():
+            if arg in filter:
+                clauses.append(predicate)
+                params.append(filter[arg])
+        for arg, column in TEXT_PREDICATES.items():
+            if arg not in filter:
+                continue
+            term = filter[arg]
+            if len(term) >= 3:
+                clauses.append(f"Ids IN (SELECT rowid FROM movies_fts WHERE {column} MATCH ?)")
+                params.append('"' + term.replace('"', '""') + '"')
+            else:
+                clauses.append(f"{column} != '' AND instr(lower({column}), lower(?)) > 0")
+                params.append(term)
+        return " WHERE " + " AND ".join(clauses), params
+
+    @staticmethod
+    def _sort_column(sortBy):
+        # Only known columns may be spliced into ORDER BY; anything else sorts
+        # every row as 0, i.e. leaves catalog order, like the in-memory path.
+        return f"COALESCE({sortBy}, 0)" if sortBy in FIELDS else None
+
+    def _select(self, sql, params):
+        return [_row(r) for r in self._conn().execute(sql, params)]
+
+    # --- Queries ---
+    def list_movies(self, filter=None, sortBy=None, order="ASC", limit=None):
+        where, params = self._where(filter)
+        sql = f"SELECT {', '.join(FIELDS)} FROM movies{where}"
+        sort = self._sort_column(sortBy)
+        direction = "DESC" if order and order.upper() == "DESC" else "ASC"
+        # Ties keep catalog (Ids) order, matching Python's stable sort.
+        sql += f" ORDER BY {sort} {direction}, Ids" if sort else " ORDER BY Ids"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        movies = self._select(sql, params)
+        ROWS_RETURNED.inc(len(movies), engine="sqlite")
+        return movies
+
+    def list_movies_page(self, filter=None, sortBy=None, order="ASC", first=None, after=None):
+        first = DEFAULT_PAGE_SIZE if first is None else max(0, min(first, MAX_PAGE_SIZE))
+        where, params = self._where(filter)
+        sort = self._sort_column(sortBy)
+        direction = "DESC" if sort and order and order.upper() == "DESC" else "ASC"
+        ordering = f"{sort} {direction}, Ids" if sort else "Ids"
+        sort = sort or "0"
+        if after is not None:
+            value, position = decode_cursor(after)
+            op = "<" if direction == "DESC" else ">"
+            seek = f"({sort} {op} ? OR ({sort} = ? AND Ids > ?))"
+            where = f"{where} AND {seek}" if where else f" WHERE {seek}"
+            params += [value, value, position]
+        sql = (f"SELECT {', '.join(FIELDS)}, {sort} FROM movies{where} "
+               f"ORDER BY {ordering} LIMIT ?")
+        rows = list(self._conn().execute(sql, params + [first + 1]))
+        edges = [{"cursor": encode_cursor(r[-1], r[0]), "node": _row(r)} for r in rows[:first]]
+        ROWS_RETURNED.inc(len(edges), engine="sqlite")
+        return {
+            "edges": edges,
+            "pageInfo": {
+                "hasNextPage": len(rows) > first,
+                "endCursor": edges[-1]["cursor"] if edges else None,
+            },
+        }
+
+    def get_movie(self, title):
+        rows = self._select(f"SELECT {', '.join(FIELDS)} FROM movies WHERE lower(Title) = lower(?) "
+                            "ORDER BY Ids LIMIT 1", [title])
+        return rows[0] if rows else None
+
+    def _title_index(self):
+        version = self.version
+        with self._titles_lock:
+            if self._titles is None or self._titles[0] != version:
+                index, titles = TitleIndex(), {}
+                for movie_id, title in self._conn().execute("SELECT Ids, Title FROM movies"):
+                    index.add(movie_id, title)
+                    titles[movie_id] = title
+                self._titles = (version, index, titles)
+            return self._titles[1:]
+
+    def search_movies(self, query, limit=10, min_score=SEARCH_MIN_SCORE):
+        index, titles = self._title_index()
+        # Exact title matches are always scored, however common their words
+        seed = [movie_id for (movie_id,) in self._conn().execute(
+            "SELECT Ids FROM movies WHERE lower(Title) = lower(?)", [query]) if movie_id in titles]
+        hits = index.search(query, titles.__getitem__, limit, min_score, seed)
+        if not hits:
+            return []
+        rows = {m["Ids"]: m for m in self._select(
+            f"SELECT {', '.join(FIELDS)} FROM movies WHERE Ids IN ({', '.join('?' * len(hits))})",
+            [movie_id for _, movie_id in hits])}
+        # A row deleted since the index was built is skipped
+        return [(score, rows[movie_id]) for score, movie_id in hits if movie_id in rows]
+
+    def aggregate_movies(self, filter=None, groupBy=None, fields=()):
+        # Only known columns may be spliced into the SQL
+        if groupBy is not None and groupBy not in GROUP_FIELDS or any(f not in METRIC_FIELDS for f in fields):
+            raise ValueError(f"Cannot aggregate {fields} by {groupBy}")
+        where, params = self._where(filter)
+        if groupBy == "Genre":
+            # Genres are a comma-separated list, which SQL can't group by: group
+            # the matching rows' genres here.
+            columns = ("Genre",) + tuple(fields)
+            rows = self._conn().execute(f"SELECT {', '.join(columns)} FROM movies{where}", params)
+            return aggregate_rows(accumulate((dict(zip(columns, row)) for row in rows), groupBy, fields),
+                                  groupBy, fields)
+        key = f"NULLIF({groupBy}, '')" if groupBy else "NULL"
+        stats = "".join(f", COUNT({f}), TOTAL({f}), MIN({f}), MAX({f})" for f in fields)
+        sql = f"SELECT {key}, COUNT(*){stats} FROM movies{where}"
+        if groupBy:
+            sql += " GROUP BY 1"
+        groups = {}
+        for row in self._conn().execute(sql, params):
+            stats = row[2:]
+            groups[row[0]] = (row[1], [stats[i:i + 4] for i in range(0, len(stats), 4)])
+        return aggregate_rows(groups, groupBy, fields)
+
+    def contains(self, title):
+        return self.get_movie(title) is not None
+
+    # --- Mutations ---
+    # Each helper runs inside a transaction opened by the caller, so the batch
+    # methods can apply many rows in one.
+    @staticmethod
+    def _create(conn, movie):
+        if conn.execute("SELECT 1 FROM movies WHERE lower(Title) = lower(?) LIMIT 1", [movie["Title"]]).fetchone():
+            return None
+        columns = [f for f in FIELDS if f != "Ids" and f in movie]
+        cursor = conn.execute(
+            f"INSERT INTO movies ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            [movie[f] for f in columns],
+        )
+        return {**movie, "Ids": cursor.lastrowid}
+
+    @staticmethod
+    def _update(conn, title, changes):
+        changes = {k: v for k, v in changes.items() if v is not None and k in FIELDS and k != "Ids"}
+        row = conn.execute("SELECT Ids FROM movies WHERE lower(Title) = lower(?) ORDER BY Ids LIMIT 1",
+                           [title]).fetchone()
+        if row is None:
+            return None
+        if changes:
+            conn.execute(f"UPDATE movies SET {', '.join(f'{k} = ?' for k in changes)} WHERE Ids = ?",
+                         [*changes.values(), row[0]])
+        return _row(conn.execute(f"SELECT {', '.join(FIELDS)} FROM movies WHERE Ids = ?", [row[0]]).fetchone())
+
+    @staticmethod
+    def _delete(conn, title):
+        deleted = [_row(r) for r in conn.execute(
+            f"SELECT {', '.join(FIELDS)} FROM movies WHERE lower(Title) = lower(?) ORDER BY Ids", [title])]
+        conn.execute("DELETE FROM movies WHERE lower(Title) = lower(?)", [title])
+        return deleted
+
+    def create_movie(self, movie):
+        with self._transaction() as conn:
+            return self._create(conn, movie)
+
+    def update_movie(self, title, changes):
+        with self._transaction() as conn:
+            return self._update(conn, title, changes)
+
+    def delete_movie(self, title):
+        with self._transaction() as conn:
+            return self._delete(conn, title)
+
+    # --- Batch mutations ---
+    @staticmethod
+    def _batch(conn, apply, items):
+        """Run `apply(conn, item)` for each item; return (results, indexes of falsy results)."""
+        done, rejected = [], []
+        for i, item in enumerate(items):
+            result = apply(conn, item)
+            if result:
+                done.append(result)
+            else:
+                rejected.append(i)
+        return done, rejected
+
+    def create_movies(self, movies):
+        with self._transaction() as conn:
+            return self._batch(conn, self._create, movies)
+
+    def update_movies(self, updates):
+        with self._transaction() as conn:
+            return self._batch(conn, lambda c, update: self._update(c, *update), updates)
+
+    def delete_movies(self, titles):
+        with self._transaction() as conn:
+            deleted, missing = self._batch(conn, self._delete, titles)
+        return [m for rows in deleted for m in rows], missing
@@ -0,0 +1,188 @@
+import threading
+
+from aggregate import accumulate, aggregate_rows
+from metrics import ROWS_RETURNED, ROWS_SCANNED, span
+from paging import paginate, top_k
+from planner import select_movies
+from titles import SEARCH_MIN_SCORE
+
+# --- Storage interface ---
+# The GraphQL resolvers only talk to a storage object with these methods:
+#
+#   list_movies(filter, sortBy, order, limit) -> [movie]
+#   list_movies_page(filter, sortBy, order, first, after) -> MovieConnection dict
+#   get_movie(title) -> movie or None
+#   search_movies(query, limit, min_score) -> [(score, movie)], most similar titles first
+#   aggregate_movies(filter, groupBy, fields) -> [AggregateRow dict] (see aggregate.py)
+#   contains(title) -> bool
+#   create_movie(movie) -> movie (with its new Ids), or None if the title is taken
+#   update_movie(title, changes) -> updated movie or None
+#   delete_movie(title) -> [deleted movies]
+#   create_movies(movies) -> ([created movies], [indexes of rejected movies (title taken)])
+#   update_movies([(title, changes)]) -> ([updated movies], [indexes of titles not found])
+#   delete_movies(titles) -> ([deleted movies], [indexes of titles not found])
+#   version -> value that changes whenever the data does (for result caching)
+#
+# A filter is a MovieFilterInput dict without null values (the resolvers drop
+# them), or None.
+# The batch methods apply all their accepted rows in one transaction: readers see
+# none or all of them, and they are persisted together.
+# MemoryStorage below serves everything from the in-memory MovieStore;
+# SQLiteStorage in sqlite_storage.py runs the same operations as SQL.
+
+
+class MemoryStorage:
+    """Storage backed by a MovieStore and persisted through a Journal.
+
+    `store` is an immutable, versioned snapshot. Readers take the current one
+    without locking and use it for the whole operation. Writers are serialized:
+    each mutation is applied to a copy, journaled, and only then published by
+    replacing `store` (a single reference assignment).
+    """
+
+    def __init__(self, store, journal, query_engine="index"):
+        self.store = store
+        self.journal = journal
+        self.query_engine = query_engine
+        self._columnar_view = None
+        self._write_lock = threading.Lock()
+        # Compaction rotates the journal under the write lock, so it never runs
+        # between a mutation being journaled and being published.
+        journal.writer_lock = self._write_lock
+
+    def _columnar(self, store):
+        # Rebuilt lazily on the first read after a mutation.
+        view = self._columnar_view
+        if view is None or view.version != store.version:
+            from columnar import ColumnarMovies
+            view = self._columnar_view = ColumnarMovies(store)
+        return view
+
+    def _filtered(self, store, filter):
+        if self.query_engine == "columnar":
+            ROWS_SCANNED.inc(len(store), engine="columnar")  # as vectors
+            return self._columnar(store).query(filter)
+        if not filter:
+            ROWS_SCANNED.inc(len(store), engine="index")
+            return store.all()
+        return select_movies(store, filter)  # counts the candidates it checks
+
+    def _write(self, mutate, record):
+        """Apply `mutate` to a copy of the store, journal `record(result)` and publish it.
+
+        Nothing is journaled or published if `mutate` returns a falsy result, and
+        nothing is published if journaling fails, so readers never see a change
+        that would be lost on restart.
+        """
+        with span("store_write"), self._write_lock:
+            draft = self.store.copy()
+            result = mutate(draft)
+            if result:
+                record(result)
+                self.store = draft
+            return result
+
+    @property
+    def version(self):
+        return self.store.version
+
+    # --- Queries ---
+    def list_movies(self, filter=None, sortBy=None, order="ASC", limit=None):
+        movies = self._list(self.store, filter, sortBy, order, limit)
+        ROWS_RETURNED.inc(len(movies), engine=self.query_engine)
+        return movies
+
+    def _list(self, store, filter, sortBy, order, limit):
+        if self.query_engine == "columnar":
+            ROWS_SCANNED.inc(len(store), engine="columnar")
+            return self._columnar(store).query(filter, sortBy, order, limit)
+        movies = self._filtered(store, filter)
+        # With a limit only the top-k rows are ever ordered
+        if sortBy and limit:
+            return top_k(movies, sortBy, order, limit)
+        if sortBy:
+            reverse = True if order and order.upper() == "DESC" else False
+            return sorted(movies, key=lambda m: m.get(sortBy) or 0, reverse=reverse)
+        return movies[:limit] if limit else movies
+
+    def list_movies_page(self, filter=None, sortBy=None, order="ASC", first=None, after=None):
+        store = self.store
+        page = paginate(self._filtered(store, filter), store.position, sortBy, order, first, after)
+        ROWS_RETURNED.inc(len(page["edges"]), engine=self.query_engine)
+        return page
+
+    def get_movie(self, title):
+        return self.store.get(title)
+
+    def search_movies(self, query, limit=10, min_score=SEARCH_MIN_SCORE):
+        return self.store.search_titles(query, limit, min_score)
+
+    def aggregate_movies(self, filter=None, groupBy=None, fields=()):
+        store = self.store
+        if self.query_engine == "columnar":
+            groups = self._columnar(store).aggregate(filter, groupBy, fields)
+        else:
+            groups = accumulate(self._filtered(store, filter), groupBy, fields)
+        return aggregate_rows(groups, groupBy, fields)
+
+    def contains(self, title):
+        return self.store.contains(title)
+
+    # --- Mutations ---
+    def create_movie(self, movie):
+        # The title check runs under the write lock, so two creates can't both pass it
+        return self._write(lambda store: None if store.contains(movie["Title"]) else store.add(movie),
+                           self.journal.put)
+
+    def update_movie(self, title, changes):
+        return self._write(lambda store: store.update(title, changes), self.journal.put)
+
+    def delete_movie(self, title):
+        return self._write(lambda store: store.delete(title),
+                           lambda deleted: self.journal.delete([m["Ids"] for m in deleted]))
+
+    # --- Batch mutations ---
+    # One store copy, one publish and one journal record per batch.
+    def create_movies(self, movies):
+        rejected = []
+
+        def mutate(store):
+            created = []
+            for i, movie in enumerate(movies):
+                if store.contains(movie["Title"]):
+                    rejected.append(i)
+                else:
+                    created.append(store.add(movie))
+            return created
+
+        return self._write(mutate, self.journal.put_many) or [], rejected
+
+    def update_movies(self, updates):
+        missing = []
+
+        def mutate(store):
+            updated = []
+            for i, (title, changes) in enumerate(updates):
+                movie = store.update(title, changes)
+                if movie is None:
+                    missing.append(i)
+                else:
+                    updated.append(movie)
+            return updated
+
+        return self._write(mutate, self.journal.put_many) or [], missing
+
+    def delete_movies(self, titles):
+        missing = []
+
+        def mutate(store):
+            deleted = []
+            for i, title in enumerate(titles):
+                rows = store.delete(title)
+                if not rows:
+                    missing.append(i)
+                deleted.extend(rows)
+            return deleted
+
+        return (self._write(mutate, lambda deleted: self.journal.delete([m["Ids"] for m in deleted])) or [],
+                missing)
@@ -0,0 +1,224 @@
+from chunked import ChunkedList, ChunkedMap
+from indexes import RangeIndex, TokenIndex, split_list, split_none
+from titles import TitleIndex
+
+RANGE_FIELDS = ("Year", "Rating", "Runtime", "Votes", "Revenue")
+
+
+def normalize_title(title):
+    return title.casefold()
+
+
+class MovieStore:
+    """In-memory movie catalog indexed by title, id, text tokens and numeric ranges.
+
+    Rows and title buckets are never modified in place; mutations replace them.
+    Every map and index is a chunked container (see chunked.py), so `copy()`
+    is O(1) and a write to the copy only copies the chunks it touches, while
+    readers keep using the original.
+    """
+
+    def __init__(self, movies=()):
+        self._slots = ChunkedList()    # catalog position -> movie dict, None once deleted
+        self._seq = ChunkedMap()       # Ids -> catalog position
+        self._by_title = ChunkedMap()  # normalized title -> (Ids, ...) (titles are not unique, e.g. "The Host")
+        self._next_id = 1
+        self.version = 0     # bumped on every mutation so derived views know when they are stale
+        self._text_indexes = {
+            "Title": TitleIndex(),
+            "Genre": TokenIndex("Genre", split_list),
+            "Director": TokenIndex("Director", split_none),
+            "Actors": TokenIndex("Actors", split_list),
+        }
+        self._range_indexes = {field: RangeIndex(field) for field in RANGE_FIELDS}
+        for movie in movies:
+            self._insert(dict(movie), index=False)
+        for field, index in self._text_indexes.items():
+            index.load(((movie["Ids"],), movie.get(field)) for movie in self._slots)
+        for field, index in self._range_indexes.items():
+            index.load((movie["Ids"], movie.get(field)) for movie in self._slots)
+
+    def copy(self):
+        """A copy to mutate while this store keeps serving readers unchanged.
+
+        Shares every chunk of the row/title/position maps and the indexes
+        until one side first changes it.
+        """
+        clone = object.__new__(MovieStore)
+        clone._slots = self._slots.copy()
+        clone._by_title = self._by_title.copy()
+        clone._seq = self._seq.copy()
+        clone._next_id = self._next_id
+        clone.version = self.version
+        clone._text_indexes = {field: index.copy() for field, index in self._text_indexes.items()}
+        clone._range_indexes = {field: index.copy() for field, index in self._range_indexes.items()}
+        return clone
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        """Build a store over a MovieSnapshot without materializing a dict per row.
+
+        Rows stay lazy snapshot views until they are first modified.
+        """
+        store = cls()
+        ids = snapshot.column("Ids").tolist()
+        store._slots = ChunkedList(snapshot.rows())
+        store._seq = ChunkedMap(zip(ids, range(len(ids))))
+        store._next_id = max(ids, default=0) + 1
+        by_title = {}
+
+        # Text columns are dictionary-encoded, so each distinct value is decoded
+        # and tokenized once for all the rows that share it.
+        for field, index in store._text_indexes.items():
+            groups = {}
+            for movie_id, code in zip(ids, snapshot.column(field).tolist()):
+                groups.setdefault(code, []).append(movie_id)
+            values = [(group, snapshot.text(field, code)) for code, group in groups.items()]
+            if field == "Title":
+                for group, value in values:
+                    if value is not None:
+                        by_title.setdefault(normalize_title(value), []).extend(group)
+            index.load(values)
+        # Titles that differ only in case share a bucket; keep it in catalog order
+        store._by_title = ChunkedMap((title, tuple(sorted(bucket, key=store._seq.__getitem__)))
+                                     for title, bucket in by_title.items())
+
+        for field, index in store._range_indexes.items():
+            index.load(zip(ids, snapshot.values(field)))
+        return store
+
+    def __len__(self):
+        return len(self._seq)
+
+    def __iter__(self):
+        return (movie for movie in self._slots if movie is not None)
+
+    def all(self):
+        if len(self._seq) == len(self._slots):  # nothing deleted
+            return list(self._slots)
+        return list(self)
+
+    # --- Lookups ---
+    def get(self, title):
+        ids = self._by_title.get(normalize_title(title))
+        return self._row(ids[0]) if ids else None
+
+    def contains(self, title):
+        return normalize_title(title) in self._by_title
+
+    def match_text(self, field, term):
+        """Ids of movies whose `field` contains `term` (case-insensitive), or None if not indexable."""
+        index = self._text_indexes.get(field)
+        return index.lookup(term) if index else None
+
+    def match_title(self, term):
+        """Candidate ids for titles containing `term` (to be checked), or None if every row is one."""
+        return self._text_indexes["Title"].containing(term)
+
+    def search_titles(self, query, limit, min_score):
+        """(score, movie) for the titles most similar to `query`, best first (see titles.py)."""
+        hits = self._text_indexes["Title"].search(query, lambda i: self._row(i)["Title"], limit, min_score,
+                                                  seed=self._by_title.get(normalize_title(query), ()))
+        return [(score, self._row(movie_id)) for score, movie_id in hits]
+
+    def count_range(self, field, lo=None, hi=None):
+        return self._range_indexes[field].count(lo, hi)
+
+    def range_ids(self, field, lo=None, hi=None):
+        """Ids of movies whose `field` lies in [lo, hi] (either bound may be None)."""
+        return self._range_indexes[field].ids(lo, hi)
+
+    def position(self, movie):
+        """Catalog position of a stored movie; only its order relative to other rows is meaningful."""
+        return self._seq[movie["Ids"]]
+
+    def rows(self, ids):
+        """Materialize the given ids as movie dicts, in catalog order."""
+        return self._slots.take(sorted(self._seq.get_many(ids)))
+
+    # --- Mutations ---
+    def add(self, movie):
+        self.version += 1
+        return self._insert({**movie, "Ids": self._next_id})
+
+    def update(self, title, changes):
+        movie = self.get(title)
+        if movie is None:
+            return None
+        self.version += 1
+        return self._apply(movie, {k: v for k, v in changes.items() if v is not None})
+
+    def delete(self, title):
+        """Delete every movie with this title and return the deleted rows."""
+        ids = self._by_title.get(normalize_title(title))
+        if not ids:
+            return []
+        self.version += 1
+        return [self._remove(movie_id) for movie_id in list(ids)]
+
+    def put(self, movie):
+        """Insert or fully replace the movie with this Ids (used when replaying the journal)."""
+        self.version += 1
+        if movie["Ids"] not in self._seq:
+            return self._insert(dict(movie))
+        return self._apply(self._row(movie["Ids"]), movie)
+
+    def delete_ids(self, ids):
+        self.version += 1
+        return [self._remove(movie_id) for movie_id in ids if movie_id in self._seq]
+
+    # --- Internals ---
+    def _row(self, movie_id):
+        return self._slots[self._seq[movie_id]]
+
+    def _indexes(self):
+        yield from self._text_indexes.items()
+        yield from self._range_indexes.items()
+
+    def _apply(self, movie, changes):
+        # The changed row replaces the old one, which earlier copies of the store
+        # (or lazy snapshot rows) still hold.
+        updated = {**movie, **changes}
+        if "Title" in changes:
+            self._unindex_title(movie)
+        for field, index in self._indexes():
+            if field in changes:
+                index.remove(movie["Ids"], movie.get(field))
+                index.add(movie["Ids"], changes[field])
+        self._slots[self._seq[movie["Ids"]]] = updated
+        if "Title" in changes:
+            self._index_title(updated)
+        return updated
+
+    def _remove(self, movie_id):
+        position = self._seq.pop(movie_id)
+        movie = self._slots[position]
+        self._slots[position] = None
+        self._unindex_title(movie)
+        for field, index in self._indexes():
+            index.remove(movie_id, movie.get(field))
+        return movie
+
+    def _insert(self, movie, index=True):
+        if "Ids" not in movie or movie["Ids"] is None:
+            movie["Ids"] = self._next_id
+        self._seq[movie["Ids"]] = len(self._slots)
+        self._slots.append(movie)
+        self._index_title(movie)
+        if index:  # otherwise the caller loads the indexes in bulk
+            for field, field_index in self._indexes():
+                field_index.add(movie["Ids"], movie.get(field))
+        self._next_id = max(self._next_id, movie["Ids"] + 1)
+        return movie
+
+    def _index_title(self, movie):
+        key = normalize_title(movie["Title"])
+        self._by_title[key] = (*self._by_title.get(key, ()), movie["Ids"])
+
+    def _unindex_title(self, movie):
+        key = normalize_title(movie["Title"])
+        ids = tuple(i for i in self._by_title.get(key, ()) if i != movie["Ids"])
+        if ids:
+            self._by_title[key] = ids
+        else:
+            self._by_title.pop(key, None)
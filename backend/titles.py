@@ -0,0 +1,198 @@
+import heapq
+import math
+import re
+
+from chunked import ChunkedMap
+from indexes import TokenIndex
+
+# --- Title search ---
+# Titles are indexed by word. Substring lookups (titleContains) go through the
+# word vocabulary's trigram index; typo-tolerant lookups (searchMovies,
+# getMovie(fuzzy: true)) find vocabulary words within one edit of each query
+# word through their single-character deletions, then score the candidate
+# titles word by word, weighting words by rarity (IDF). Both only read the
+# postings of the query's rarer words.
+
+SEARCH_MIN_SCORE = 0.3  # searchMovies
+MATCH_MIN_SCORE = 0.6   # getMovie(fuzzy: true) and the chatbot's title rules
+# Title words the query doesn't mention count half: "star wars" should still find
+# "Star Wars: Episode VII - The Force Awakens", just below an exact "Star Wars".
+EXTRA_WORD_WEIGHT = 0.5
+# Postings longer than this (and than the share of all titles) are never read:
+# such a word says little about which title is meant, and reading it would touch
+# a large part of the catalog. Titles that only share such words with the query
+# are found only if they are an exact match (see `seed` in TitleIndex.search).
+MAX_POSTINGS = 1000
+MAX_POSTINGS_SHARE = 0.01
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+def title_words(title):
+    return _WORD.findall(title.lower())
+
+
+def deletions(word):
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+def edit_distance(a, b):
+    """Insertions, deletions, substitutions and swaps of adjacent characters needed to turn a into b."""
+    previous, current = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        before, previous, current = previous, current, [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+    return current[-1]
+
+
+def word_similarity(a, b):
+    return 1 - edit_distance(a, b) / max(len(a), len(b))
+
+
+class TitleIndex(TokenIndex):
+    """Word index over titles for substring and typo-tolerant lookups.
+
+    On top of TokenIndex's postings and trigram index it maps every
+    single-character deletion of a word (3+ characters) to the words it came
+    from: two words within one edit of each other (including a swap of
+    adjacent letters) are equal or share a deletion.
+    """
+
+    def __init__(self):
+        super().__init__("Title", title_words)
+        self._variants = ChunkedMap()  # deletion -> set of words
+        self._owned_variants = set()
+        self.rows = 0
+
+    def copy(self):
+        clone = super().copy()
+        clone._variants = self._variants.copy()
+        clone._owned_variants, self._owned_variants = set(), set()
+        clone.rows = self.rows
+        return clone
+
+    def load(self, groups):
+        groups = list(groups)
+        super().load(groups)
+        self.rows += sum(len(movie_ids) for movie_ids, _ in groups)
+
+    def remove(self, movie_id, value):
+        super().remove(movie_id, value)
+        self.rows -= 1
+
+    def _add_token(self, token):
+        super()._add_token(token)
+        if len(token) >= 3:
+            for variant in deletions(token):
+                if variant not in self._variants:
+                    self._variants[variant] = set()
+                    self._owned_variants.add(variant)
+                self._own(self._variants, self._owned_variants, variant).add(token)
+
+    def _drop_token(self, token):
+        super()._drop_token(token)
+        if len(token) >= 3:
+            for variant in deletions(token):
+                if token in self._variants.get(variant, ()):
+                    words = self._own(self._variants, self._owned_variants, variant)
+                    words.discard(token)
+                    if not words:
+                        del self._variants[variant]
+                        self._owned_variants.discard(variant)
+
+    def containing(self, term):
+        """Candidate ids for titles containing `term`, or None if the term has no word to look up.
+
+        Candidates still have to be checked against the raw title.
+        """
+        words = title_words(term)
+        if not words:
+            return None
+        # Inner words appear whole and the edge ones as part of a word; any one
+        # narrows the candidates, the longest usually the most.
+        ids = set()
+        for token in self.matching_tokens(max(words, key=len)):
+            ids.update(*self._postings[token].chunks())
+        return ids
+
+    def similar_words(self, word):
+        """{vocabulary word: similarity} for the words within one edit of `word`."""
+        if word in self._postings:
+            return {word: 1.0}
+        if len(word) < 3:
+            return {}
+        found = set(self._variants.get(word, ()))   # one letter missing from `word`
+        for variant in deletions(word):
+            if variant in self._postings:           # one letter too many
+                found.add(variant)
+            found.update(self._variants.get(variant, ()))  # one letter wrong or swapped
+        return {other: word_similarity(word, other) for other in found}
+
+    def _weight(self, word):
+        # Inverse document frequency; a word no title has weighs the most
+        return math.log(1 + self.rows / (len(self._postings.get(word, ())) or 1))
+
+    def _score(self, matches, weights, query_weight, title):
+        """Weighted share of the query found in `title`, between 0 and 1.
+
+        Each query word counts its weight times the similarity of its best match
+        in the title. Title words that match no query word add part of their
+        weight to the total, so both missing and extra words lower the score.
+        """
+        words = set(title_words(title))
+        matched, used = 0.0, set()
+        for match, weight in zip(matches, weights):
+            best = max((word for word in match if word in words), key=match.get, default=None)
+            if best is not None:
+                matched += weight * match[best]
+                used.add(best)
+        return matched / (query_weight + EXTRA_WORD_WEIGHT * sum(map(self._weight, words - used)))
+
+    def search(self, query, title_of, limit=10, min_score=SEARCH_MIN_SCORE, seed=()):
+        """Up to `limit` (score, id) pairs for the titles most similar to `query`, best first.
+
+        `seed` ids (e.g. exact title matches) are always scored.
+        """
+        matches = [self.similar_words(word) for word in title_words(query)]
+        if not matches:
+            return []
+        weights = [max(map(self._weight, match), default=self._weight(None)) for match in matches]
+        query_weight = sum(weights)
+        # A title containing none of the probed words scores at most the weight of
+        # the others over query_weight. Probe the heaviest (rarest) words until that
+        # is below min_score; common words like "the" are then only scored, never read.
+        max_postings = max(MAX_POSTINGS, MAX_POSTINGS_SHARE * self.rows)
+        known = dict.fromkeys(seed, query_weight)  # id -> matched weight so far
+        rest = sum(w for match, w in zip(matches, weights) if match)
+        for weight, match in sorted(((w, m) for m, w in zip(matches, weights) if m), key=lambda wm: -wm[0]):
+            if rest < min_score * query_weight:
+                break
+            if sum(len(self._postings[word]) for word in match) > max_postings:
+                continue
+            best = {}
+            for word, sim in match.items():
+                for movie_id in self._postings[word]:
+                    if sim > best.get(movie_id, 0):
+                        best[movie_id] = sim
+            for movie_id, sim in best.items():
+                known[movie_id] = known.get(movie_id, 0) + weight * sim
+            rest -= weight
+
+        # Score candidates by their upper bound, best first, until no remaining one
+        # can beat the current top `limit`.
+        top, floor = [], min_score  # min-heap of (score, -id)
+        for movie_id, matched in sorted(known.items(), key=lambda item: -item[1]):
+            if min(1.0, (matched + rest) / query_weight) < floor or not limit:
+                break
+            score = self._score(matches, weights, query_weight, title_of(movie_id))
+            if score >= floor:
+                heapq.heappush(top, (score, -movie_id))
+                if len(top) > limit:
+                    heapq.heappop(top)
+                if len(top) == limit:
+                    floor = max(floor, top[0][0])
+        return [(score, -neg_id) for score, neg_id in sorted(top, reverse=True)]
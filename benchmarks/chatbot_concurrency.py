@@ -0,0 +1,105 @@
+"""Fire concurrent /chatbot requests at the ASGI backend backed by a fake Ollama.
+
+Usage: python benchmarks/chatbot_concurrency.py [--requests 200] [--latency 0.5]
+                                                [--max-concurrency 4] [--same-prompt]
+
+Starts benchmarks/fake_ollama.py in-process and `uvicorn asgi:app` in a
+temporary directory. With distinct prompts, throughput is bounded by
+--max-concurrency / --latency. With --same-prompt, every request is coalesced
+into a single upstream call.
+"""
+import argparse
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from fake_ollama import FakeOllama
+from query_engine import BACKEND_DIR
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(url, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError(f"Backend did not start at {url}")
+
+
+def fire(url, prompts):
+    # One thread per simulated chat session; the load generator itself must not be the bottleneck
+    def one(prompt):
+        start = time.perf_counter()
+        response = requests.post(url, json={"query": prompt}, timeout=600)
+        return response.status_code, time.perf_counter() - start
+
+    with ThreadPoolExecutor(len(prompts)) as pool:
+        return list(pool.map(one, prompts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.5, help="fake LLM seconds per call")
+    parser.add_argument("--max-concurrency", type=int, default=4, help="MOVIEBOT_OLLAMA_MAX_CONCURRENCY")
+    parser.add_argument("--queue-timeout", type=float, default=600, help="MOVIEBOT_OLLAMA_QUEUE_TIMEOUT")
+    parser.add_argument("--same-prompt", action="store_true", help="send one identical prompt")
+    args = parser.parse_args()
+
+    ollama = FakeOllama(("127.0.0.1", 0), args.latency).start()
+    port = free_port()
+    env = {
+        **os.environ,
+        "MOVIEBOT_OLLAMA_URL": ollama.url,
+        "MOVIEBOT_OLLAMA_MAX_CONCURRENCY": str(args.max_concurrency),
+        "MOVIEBOT_OLLAMA_QUEUE_TIMEOUT": str(args.queue_timeout),
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        shutil.copy(os.path.join(BACKEND_DIR, "imdb.json"), tmp)
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "asgi:app", "--app-dir", BACKEND_DIR,
+             "--port", str(port), "--log-level", "warning"],
+            cwd=tmp, env=env, stdout=subprocess.DEVNULL,
+        )
+        try:
+            wait_until_up(f"http://127.0.0.1:{port}/chatbot/cache")
+            # Phrasings the rule-based fast path doesn't understand, so every one needs the LLM
+            prompts = [f"something like request number {0 if args.same_prompt else i}"
+                       for i in range(args.requests)]
+            start = time.perf_counter()
+            results = fire(f"http://127.0.0.1:{port}/chatbot", prompts)
+            elapsed = time.perf_counter() - start
+            stats = requests.get(f"http://127.0.0.1:{port}/chatbot/ollama").json()
+        finally:
+            server.terminate()
+            server.wait()
+
+    latencies = sorted(t for _, t in results)
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    print(f"{args.requests} requests in {elapsed:.2f}s ({args.requests / elapsed:.1f} req/s)")
+    print(f"  status codes: {statuses}")
+    print(f"  latency p50 {statistics.median(latencies):.2f}s  "
+          f"p95 {latencies[int(len(latencies) * 0.95) - 1]:.2f}s  max {latencies[-1]:.2f}s")
+    print(f"  upstream LLM calls: {ollama.requests} (coalesced: {stats['coalesced']})")
+
+
+if __name__ == "__main__":
+    main()
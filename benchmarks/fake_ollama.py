@@ -0,0 +1,101 @@
+"""Deterministic stand-in for the Ollama chat API, for load tests without a GPU.
+
+Usage: python benchmarks/fake_ollama.py [--port 11435] [--latency 0.5]
+
+Point the backend at it with MOVIEBOT_OLLAMA_URL=http://127.0.0.1:11435/api/chat.
+Every chat request takes --latency seconds and answers with the same
+listMovies query; with "stream": true the answer arrives word by word over
+that time. GET /stats returns how many chat requests were served.
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RESPONSE_QUERY = 'query { listMovies(sortBy: "Rating", order: "DESC", limit: 5) { Title Year Rating } }'
+
+
+class FakeOllama(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.5):
+        super().__init__(address, FakeOllamaHandler)
+        self.latency = latency
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}/api/chat"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like Ollama
+    # Headers and body go out as separate writes; with Nagle's algorithm the body
+    # would wait for the client's delayed ACK (~40 ms) on every call.
+    disable_nagle_algorithm = True
+
+    def _send(self, body):
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_chunk(self, body):
+        data = json.dumps(body).encode() + b"\n"
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def _stream(self, model):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        words = RESPONSE_QUERY.split(" ")
+        for i, word in enumerate(words):
+            time.sleep(self.server.latency / len(words))
+            content = word if i == 0 else " " + word
+            self._send_chunk({"model": model, "message": {"role": "assistant", "content": content}, "done": False})
+        self._send_chunk({"model": model, "message": {"role": "assistant", "content": ""}, "done": True})
+        self.wfile.write(b"0\r\n\r\n")
+
+    def do_GET(self):
+        self._send({"requests": self.server.requests})
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with self.server.lock:
+            self.server.requests += 1
+        if payload.get("stream"):
+            self._stream(payload.get("model"))
+            return
+        time.sleep(self.server.latency)
+        self._send({
+            "model": payload.get("model"),
+            "message": {"role": "assistant", "content": RESPONSE_QUERY},
+            "done": True,
+        })
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per chat request")
+    args = parser.parse_args()
+    server = FakeOllama(("127.0.0.1", args.port), args.latency)
+    print(f"Fake Ollama listening on {server.url} ({args.latency:g}s per request)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
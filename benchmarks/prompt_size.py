@@ -0,0 +1,76 @@
+"""Measure the chatbot prompt: size per layout, and Ollama prompt-eval / time-to-first-token.
+
+Usage: python benchmarks/prompt_size.py [--ollama-url http://127.0.0.1:11434/api/chat] [--examples 0 3 5]
+
+Without --ollama-url only sizes are reported; "~tokens" counts words and
+punctuation, a rough stand-in for the model's tokenizer. With a running Ollama
+each layout is called twice with different questions: the first call evaluates
+the whole prompt, the second shows what is left once the system prompt is cached.
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+
+import requests
+
+from query_engine import BACKEND_DIR
+
+QUESTIONS = ["list 5 horror movies from 2012", "which films did Denis Villeneuve direct after 2010"]
+
+
+def approx_tokens(text):
+    return len(re.findall(r"\w+|[^\w\s]", text))
+
+
+def measure_call(url, payload):
+    """Stream one chat call; return (seconds to first token, prompt_eval_count, prompt eval seconds)."""
+    start = time.perf_counter()
+    first_token = None
+    with requests.post(url, json={**payload, "stream": True}, stream=True, timeout=600) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            chunk = json.loads(line)
+            if first_token is None and chunk.get("message", {}).get("content"):
+                first_token = time.perf_counter() - start
+            if chunk.get("done"):
+                return first_token, chunk.get("prompt_eval_count"), chunk.get("prompt_eval_duration", 0) / 1e9
+    return first_token, None, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ollama-url")
+    parser.add_argument("--examples", type=int, nargs="+", default=[0, 3, 5],
+                        help="MOVIEBOT_PROMPT_EXAMPLES values to compare")
+    args = parser.parse_args()
+
+    # app.py loads the catalog from the working directory on import
+    with tempfile.TemporaryDirectory() as tmp:
+        shutil.copy(os.path.join(BACKEND_DIR, "imdb.json"), tmp)
+        os.chdir(tmp)
+        sys.path.insert(0, BACKEND_DIR)
+        import app
+        from prompt import build_system_prompt, chat_messages
+
+        print(f"{'examples':>9}  {'system chars':>12}{'~tokens':>9}  {'user chars':>10}{'~tokens':>9}")
+        for k in args.examples:
+            system_prompt = build_system_prompt(app.type_defs, include_examples=not k)
+            user = chat_messages(system_prompt, QUESTIONS[0], k)[1]["content"]
+            print(f"{k or 'all':>9}  {len(system_prompt):>12}{approx_tokens(system_prompt):>9}"
+                  f"  {len(user):>10}{approx_tokens(user):>9}")
+            if not args.ollama_url:
+                continue
+            for question in QUESTIONS:
+                payload = {**app.ollama_payload(question), "messages": chat_messages(system_prompt, question, k)}
+                ttft, evaluated, eval_seconds = measure_call(args.ollama_url, payload)
+                print(f"{'':>11}ttft {ttft:.3f}s  prompt_eval_count {evaluated}  prompt eval {eval_seconds:.3f}s")
+        os.chdir(BACKEND_DIR)
+
+
+if __name__ == "__main__":
+    main()
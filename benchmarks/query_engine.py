@@ -0,0 +1,88 @@
+"""Compare the index-based and columnar listMovies engines on synthetic catalogs.
+
+Usage: python benchmarks/query_engine.py [--sizes 1000 100000 1000000] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+sys.path.insert(0, BACKEND_DIR)
+
+from columnar import ColumnarMovies  # noqa: E402
+from planner import select_movies  # noqa: E402
+from store import MovieStore  # noqa: E402
+
+QUERIES = [
+    ("all, sort by Votes DESC", None, "Votes", "DESC"),
+    ("all, sort by Revenue ASC", None, "Revenue", "ASC"),
+    ("rating >= 8, sort by Rating DESC", {"minRating": 8.0}, "Rating", "DESC"),
+    ("2010-2012 action", {"minYear": 2010, "maxYear": 2012, "genreContains": "Action"}, None, None),
+    ("runtime 90-100, sort by Year", {"minRuntime": 90, "maxRuntime": 100}, "Year", "ASC"),
+]
+
+
+def synthetic_catalog(base, size, seed=0):
+    rng = random.Random(seed)
+    movies = []
+    for i in range(size):
+        movie = dict(base[i % len(base)])
+        movie["Ids"] = i + 1
+        movie["Title"] = f"{movie['Title']} #{i // len(base)}" if i >= len(base) else movie["Title"]
+        movie["Year"] = rng.randint(1990, 2025)
+        movie["Runtime"] = rng.randint(70, 200)
+        movie["Rating"] = round(rng.uniform(1, 10), 1)
+        movie["Votes"] = rng.randint(0, 2_000_000)
+        movie["Revenue"] = None if rng.random() < 0.13 else round(rng.uniform(0, 900), 2)
+        movies.append(movie)
+    return movies
+
+
+def index_query(store, filter, sortBy, order):
+    movies = select_movies(store, filter) if filter else store.all()
+    if sortBy:
+        movies = sorted(movies, key=lambda m: m.get(sortBy) or 0, reverse=order == "DESC")
+    return movies
+
+
+def best_of(repeat, fn):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with open(os.path.join(BACKEND_DIR, "imdb.json")) as f:
+        base = json.load(f)
+
+    for size in args.sizes:
+        movies = synthetic_catalog(base, size)
+        start = time.perf_counter()
+        store = MovieStore(movies)
+        store_build = time.perf_counter() - start
+        start = time.perf_counter()
+        columnar = ColumnarMovies(store)
+        columnar_build = time.perf_counter() - start
+        print(f"\n{size:,} rows  (store build {store_build:.2f}s, columnar build {columnar_build:.2f}s)")
+        print(f"  {'query':<36}{'index (ms)':>12}{'columnar (ms)':>15}{'speedup':>10}")
+        for name, filter, sortBy, order in QUERIES:
+            expected = [m["Ids"] for m in index_query(store, filter, sortBy, order)]
+            assert [m["Ids"] for m in columnar.query(filter, sortBy, order)] == expected, name
+            t_index = best_of(args.repeat, lambda: index_query(store, filter, sortBy, order))
+            t_columnar = best_of(args.repeat, lambda: columnar.query(filter, sortBy, order))
+            print(f"  {name:<36}{t_index * 1000:>12.2f}{t_columnar * 1000:>15.2f}{t_index / t_columnar:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
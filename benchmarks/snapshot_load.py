@@ -0,0 +1,77 @@
+"""Compare startup load time and peak RSS of JSON vs binary snapshots.
+
+Usage: python benchmarks/snapshot_load.py [--sizes 1000 100000 1000000]
+
+Each load runs in a fresh interpreter so RSS reflects only that format
+(POSIX only: peak RSS comes from resource.getrusage).
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from query_engine import BACKEND_DIR, synthetic_catalog
+
+sys.path.insert(0, BACKEND_DIR)
+from snapshot import write_snapshot  # noqa: E402
+
+LOADERS = {
+    "json": """
+import json
+from store import MovieStore
+with open(PATH) as f:
+    store = MovieStore(json.load(f))
+""",
+    "binary": """
+from snapshot import MovieSnapshot
+from store import MovieStore
+store = MovieStore.from_snapshot(MovieSnapshot(PATH))
+""",
+}
+
+PROBE = """
+import resource, sys, time
+sys.path.insert(0, {backend!r})
+PATH = {path!r}
+start = time.perf_counter()
+{loader}
+elapsed = time.perf_counter() - start
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, len(store))
+"""
+
+
+def measure(fmt, path):
+    code = PROBE.format(backend=BACKEND_DIR, path=path, loader=LOADERS[fmt])
+    out = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+    elapsed, rss_kb, count = out.split()
+    return float(elapsed), int(rss_kb) / 1024, int(count)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    with open(os.path.join(BACKEND_DIR, "imdb.json")) as f:
+        base = json.load(f)
+
+    print(f"{'rows':>10}  {'format':<8}{'file (MB)':>10}{'load (s)':>10}{'peak RSS (MB)':>15}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            movies = synthetic_catalog(base, size)
+            paths = {"json": os.path.join(tmp, "movies.json"), "binary": os.path.join(tmp, "movies.bin")}
+            with open(paths["json"], "w") as f:
+                json.dump(movies, f, indent=4)
+            write_snapshot(paths["binary"], movies)
+            del movies
+            for fmt, path in paths.items():
+                elapsed, rss_mb, count = measure(fmt, path)
+                assert count == size
+                size_mb = os.path.getsize(path) / 2 ** 20
+                print(f"{size:>10,}  {fmt:<8}{size_mb:>10.1f}{elapsed:>10.2f}{rss_mb:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""Benchmark suite: startup time, RSS and endpoint latency on synthetic catalogs.
+
+Usage: python benchmarks/suite.py [--sizes 1000 100000 1000000] [--concurrency 1 8 32]
+                                  [--requests 300] [--server flask|asgi] [--storage memory|sqlite]
+                                  [--engine index|columnar] [--llm-latency 0.05]
+                                  [--workloads listMovies getMovie ...] [--output results.json]
+
+For each size, a catalog is generated from data/imdb.csv (titles and text
+repeat, numbers are random; see query_engine.synthetic_catalog) and the
+backend is started on it in a temporary directory, with /chatbot pointed at
+benchmarks/fake_ollama.py. Each workload then runs --requests requests at
+each concurrency level. Reported per run: startup time (process start to first
+response), RSS after startup and peak RSS (Linux, from /proc), and per workload
+throughput, p50/p95/p99/max latency and errors. Results are printed and saved
+as JSON, so runs from different commits can be compared.
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from chatbot_concurrency import free_port, wait_until_up
+from fake_ollama import FakeOllama
+from query_engine import BACKEND_DIR, synthetic_catalog
+
+sys.path.insert(0, BACKEND_DIR)
+from bulk import movie_from_row  # noqa: E402
+
+CSV_FILE = os.path.join(BACKEND_DIR, "..", "data", "imdb.csv")
+
+LIST_QUERY = """query($filter: MovieFilterInput, $sortBy: String, $order: String, $limit: Int) {
+  listMovies(filter: $filter, sortBy: $sortBy, order: $order, limit: $limit) { Ids Title Year Rating }
+}"""
+GET_QUERY = "query($title: String!) { getMovie(title: $title) { Ids Title Year Rating Director } }"
+UPDATE_QUERY = "mutation($title: String!, $rating: Float) { updateMovie(title: $title, input: {Rating: $rating}) { Title Rating } }"
+CREATE_QUERY = "mutation($input: MovieInput!) { createMovie(input: $input) { Ids Title } }"
+
+GENRES = ["Action", "Comedy", "Drama", "Horror", "Sci-Fi", "Thriller"]
+
+
+def load_base():
+    with open(CSV_FILE, newline="", encoding="utf-8") as f:
+        return [dict(movie_from_row(row), Ids=i + 1) for i, row in enumerate(csv.DictReader(f))]
+
+
+# --- Workloads ---
+# Each returns (path, JSON body) for request number i. Arguments vary with i so
+# most reads miss the result cache; chatbot prompts are unique so every one
+# goes to the (fake) LLM, except the "chatbotRules" ones the fast path answers.
+def list_movies(run, i):
+    rng = random.Random(i)
+    shape = i % 4
+    if shape == 0:
+        filter = {"minRating": round(rng.uniform(1, 9.5), 1)}
+    elif shape == 1:
+        year = rng.randint(1990, 2022)
+        filter = {"minYear": year, "maxYear": year + rng.randint(0, 3), "genreContains": rng.choice(GENRES)}
+    elif shape == 2:
+        filter = {"directorContains": rng.choice(run["directors"])}
+    else:
+        filter = None
+    return "/graphql", {"query": LIST_QUERY, "variables": {
+        "filter": filter, "sortBy": rng.choice(["Rating", "Votes", "Year", None]), "order": "DESC",
+        "limit": rng.randint(10, 50)}}
+
+
+def get_movie(run, i):
+    return "/graphql", {"query": GET_QUERY, "variables": {"title": random.Random(i).choice(run["titles"])}}
+
+
+def update_movie(run, i):
+    rng = random.Random(i)
+    return "/graphql", {"query": UPDATE_QUERY, "variables": {
+        "title": rng.choice(run["titles"]), "rating": round(rng.uniform(1, 10), 1)}}
+
+
+def create_movie(run, i):
+    return "/graphql", {"query": CREATE_QUERY, "variables": {"input": {
+        "Title": f"Benchmark movie {run['round']}-{i}", "Year": 2024, "Genre": "Drama", "Rating": 7.0}}}
+
+
+def chatbot(run, i):
+    return "/chatbot", {"query": f"something like request number {run['round']}-{i}"}
+
+
+def chatbot_rules(run, i):
+    rng = random.Random(i)
+    return "/chatbot", {"query": f"list {rng.choice(GENRES).lower()} movies from {rng.randint(1990, 2025)}"}
+
+
+WORKLOADS = {
+    "listMovies": list_movies,
+    "getMovie": get_movie,
+    "updateMovie": update_movie,
+    "createMovie": create_movie,
+    "chatbot": chatbot,
+    "chatbotRules": chatbot_rules,
+}
+
+
+def percentile(ordered, p):
+    return ordered[max(0, math.ceil(p * len(ordered)) - 1)]
+
+
+def drive(base_url, make_request, run, requests_count, concurrency):
+    """Send `requests_count` requests from `concurrency` threads; return the workload's result dict."""
+    local = threading.local()
+
+    def one(i):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        path, body = make_request(run, i)
+        start = time.perf_counter()
+        try:
+            response = session.post(base_url + path, json=body, timeout=600)
+            result = response.json()
+            ok = response.status_code == 200 and not result.get("errors") and not result.get("error")
+            if ok and path == "/chatbot":
+                ok = not result["result"].get("errors")
+        except (requests.RequestException, ValueError):
+            ok = False
+        return ok, time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(one, range(requests_count)))
+    elapsed = time.perf_counter() - start
+    latencies = sorted(t * 1000 for _, t in results)
+    return {
+        "concurrency": concurrency,
+        "requests": requests_count,
+        "errors": sum(not ok for ok, _ in results),
+        "seconds": round(elapsed, 3),
+        "throughput": round(requests_count / elapsed, 1),
+        "latency_ms": {name: round(percentile(latencies, p), 2)
+                       for name, p in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99), ("max", 1.0))},
+    }
+
+
+def rss_mb(pid):
+    """(current, peak) resident set size in MB, or (None, None) where /proc isn't available."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            status = dict(line.split(":", 1) for line in f)
+    except OSError:
+        return None, None
+    return tuple(round(int(status[key].split()[0]) / 1024, 1) for key in ("VmRSS", "VmHWM"))
+
+
+def server_command(server, port):
+    if server == "asgi":
+        return [sys.executable, "-m", "uvicorn", "asgi:app", "--app-dir", BACKEND_DIR,
+                "--port", str(port), "--log-level", "warning"]
+    return [sys.executable, "-c", f"import app; app.app.run(port={port}, threaded=True)"]
+
+
+def run_size(args, base, size, ollama):
+    movies = synthetic_catalog(base, size)
+    run = {
+        "titles": [m["Title"] for m in movies],
+        "directors": sorted({m["Director"] for m in movies[:len(base)] if m.get("Director")}),
+    }
+    port = free_port()
+    env = {
+        **os.environ,
+        "PYTHONPATH": BACKEND_DIR,
+        "MOVIEBOT_OLLAMA_URL": ollama.url,
+        "MOVIEBOT_OLLAMA_MAX_CONCURRENCY": str(max(args.concurrency)),
+        "MOVIEBOT_STORAGE": args.storage,
+        "MOVIEBOT_QUERY_ENGINE": args.engine,
+        # Fold the journal only at shutdown, so compaction doesn't land inside a measurement
+        "MOVIEBOT_JOURNAL_COMPACT_SECONDS": "3600",
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, "imdb.json"), "w") as f:
+            json.dump(movies, f)
+        del movies
+        start = time.perf_counter()
+        server = subprocess.Popen(server_command(args.server, port), cwd=tmp, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            base_url = f"http://127.0.0.1:{port}"
+            wait_until_up(base_url + "/graphql/cache", timeout=args.startup_timeout)
+            startup = time.perf_counter() - start
+            rss_idle, _ = rss_mb(server.pid)
+            result = {"size": size, "startup_seconds": round(startup, 2), "rss_mb": {"idle": rss_idle},
+                      "workloads": {}}
+            print(f"\n{size:,} rows: started in {startup:.2f}s, RSS {rss_idle} MB")
+            print(f"  {'workload':<14}{'conc':>5}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+            for name in args.workloads:
+                result["workloads"][name] = []
+                for concurrency in args.concurrency:
+                    run["round"] = f"{size}-{concurrency}"
+                    stats = drive(base_url, WORKLOADS[name], run, args.requests, concurrency)
+                    result["workloads"][name].append(stats)
+                    latency = stats["latency_ms"]
+                    print(f"  {name:<14}{concurrency:>5}{stats['throughput']:>9}{latency['p50']:>9}"
+                          f"{latency['p95']:>9}{latency['p99']:>9}{stats['errors']:>8}")
+            result["rss_mb"]["after"], result["rss_mb"]["peak"] = rss_mb(server.pid)
+            result["cache"] = requests.get(base_url + "/graphql/cache").json()
+        finally:
+            server.terminate()
+            server.wait()
+    print(f"  RSS after load {result['rss_mb']['after']} MB, peak {result['rss_mb']['peak']} MB")
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=300, help="requests per workload and concurrency level")
+    parser.add_argument("--workloads", nargs="+", choices=list(WORKLOADS), default=list(WORKLOADS))
+    parser.add_argument("--server", choices=["flask", "asgi"], default="flask")
+    parser.add_argument("--storage", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--engine", choices=["index", "columnar"], default="index")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="fake LLM seconds per call")
+    parser.add_argument("--startup-timeout", type=float, default=900)
+    parser.add_argument("--output", default="benchmark-results.json")
+    args = parser.parse_args()
+
+    base = load_base()
+    ollama = FakeOllama(("127.0.0.1", 0), args.llm_latency).start()
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "settings": {key: value for key, value in vars(args).items() if key != "output"},
+        "runs": [run_size(args, base, size, ollama) for size in args.sizes],
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
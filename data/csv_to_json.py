@@ -1,8 +1,15 @@
+import os
+import sys
 import pandas as pd
 import json
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+from snapshot import write_snapshot
+
 data=pd.read_csv('imdb.csv')
 
 json_data = data.to_json('imdb.json',orient='records',indent=4)
 
-
+# Compact memory-mappable snapshot for MOVIEBOT_SNAPSHOT_FORMAT=binary (NaN -> None)
+records = json.loads(data.to_json(orient='records'))
+write_snapshot('imdb.bin', records)
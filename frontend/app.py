@@ -2,6 +2,8 @@
 import streamlit as st
 import requests
 import json
+import math
+from contextlib import closing
 
 # --- Page Configuration ---
 st.set_page_config(
@@ -14,8 +16,21 @@ st.title("🎬 MovieBot: Your GraphQL Movie Assistant")
 st.caption("I can help you find, add, update, or delete movies from the database using natural language.")
 
 # --- Backend API URL ---
-BACKEND_URL = "http://127.0.0.1:5000/chatbot"
-BACKEND_GRAPHQL_URL = "http://127.0.0.1:5000/graphql" # New URL for direct GraphQL calls
+BACKEND_STREAM_URL = "http://127.0.0.1:5000/chatbot/stream"  # Newline-delimited JSON events
+
+PAGE_SIZE = 10  # Movie cards shown at once; longer lists get a page selector
+
+
+# --- Backend calls ---
+def http_session():
+    """This browser session's keep-alive connection pool, reused across its reruns.
+
+    requests.Session is not thread-safe, and Streamlit runs each browser
+    session's script in its own thread, so sessions don't share one.
+    """
+    if "http_session" not in st.session_state:
+        st.session_state.http_session = requests.Session()
+    return st.session_state.http_session
 
 
 def display_movie_card_html(movie):
@@ -71,47 +86,113 @@ def display_movie_card_html(movie):
     st.markdown(html_card, unsafe_allow_html=True)
 
 
+def display_aggregate_table(rows):
+    """Shows aggregateMovies rows as a table: one line per group, one column per statistic."""
+    table = []
+    for row in rows:
+        line = {"Group": row.get("group") or "All", "Movies": row.get("count")}
+        for metric in row.get("metrics") or []:
+            for stat in ("avg", "min", "max", "sum"):
+                if stat in metric:
+                    value = metric[stat]
+                    line[f"{stat} {metric['field']}"] = round(value, 2) if value is not None else None
+        table.append(line)
+    st.table(table)
+
+
+def movie_page(count, key):
+    """Page selector for a list of `count` movies; returns the 1-based page to show."""
+    if count <= PAGE_SIZE:
+        return 1
+    pages = math.ceil(count / PAGE_SIZE)
+    return st.number_input(f"Page (of {pages}, {count} movies)", min_value=1, max_value=pages, key=key)
+
+
+def display_movie_list(movies, key):
+    """Shows one page of movie cards, so long lists don't put every card on the page."""
+    cards = st.container()
+    page = movie_page(len(movies), key)
+    with cards:
+        for movie in movies[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]:
+            display_movie_card_html(movie)
+
+
 def find_and_update_movie_entry(new_data):
-    """Finds and updates an existing movie entry in session state, or appends a new one."""
+    """Finds the most recent single-movie message for this title in session state, if any."""
     title = new_data.get("Title")
     if not title:
         return None
 
     # Iterate backward to find the most recent message for this movie
     for message in reversed(st.session_state.messages):
-        if message["role"] == "assistant" and message.get("data", {}).get("Title") == title:
+        data = message.get("data")
+        if message["role"] == "assistant" and isinstance(data, dict) and data.get("Title") == title:
             return message
 
     # If no existing entry is found, return None to indicate a new entry
     return None
 
-def fetch_full_movie_details(title):
-    """Fetches the full movie details from the backend using a direct GraphQL query."""
-    query = """
-        query getMovie($title: String!) {
-            getMovie(title: $title) {
-                Title
-                Year
-                Rating
-                Runtime
-                Description
-                Director
-                Actors
-            }
-        }
-    """
-    variables = {"title": title}
-    try:
-        response = requests.post(
-            BACKEND_GRAPHQL_URL,
-            json={"query": query, "variables": variables}
-        )
+
+def render_result(result):
+    """Renders a complete GraphQL result from the chatbot and records it in the chat history."""
+    data = result.get("data")
+
+    # --- Card Display Logic and Session State Update ---
+    if data:
+        if "listMovies" in data and data["listMovies"]:
+            st.success("Here are the movies I found:")
+            display_movie_list(data["listMovies"], f"page-{len(st.session_state.messages)}")
+            st.session_state.messages.append({"role": "assistant", "type": "movie_list", "data": data["listMovies"]})
+        elif "aggregateMovies" in data and data["aggregateMovies"] is not None:
+            st.success("Here are the numbers:")
+            display_aggregate_table(data["aggregateMovies"])
+            st.session_state.messages.append({"role": "assistant", "type": "aggregate", "data": data["aggregateMovies"]})
+        elif "getMovie" in data and data["getMovie"]:
+            st.success("Here is the movie you requested:")
+            display_movie_card_html(data["getMovie"])
+            st.session_state.messages.append({"role": "assistant", "type": "movie_single", "data": data["getMovie"]})
+        elif "createMovie" in data and data["createMovie"]:
+            st.success("Movie created successfully! Details are below:")
+            display_movie_card_html(data["createMovie"])
+            st.session_state.messages.append({"role": "assistant", "type": "create_success", "data": data["createMovie"]})
+        elif "updateMovie" in data and data["updateMovie"]:
+            updated_movie = data["updateMovie"]
+            if updated_movie.get("Title"):
+                # The mutation returns the updated row; fields it didn't select keep the values already shown
+                existing_message = find_and_update_movie_entry(updated_movie)
+                if existing_message:
+                    updated_movie = {**existing_message["data"], **updated_movie}
+                    existing_message["type"] = "update_success"
+                    existing_message["data"] = updated_movie
+                else:
+                    st.session_state.messages.append({"role": "assistant", "type": "update_success", "data": updated_movie})
+
+                st.success("Movie updated successfully! Here are the new details:")
+                display_movie_card_html(updated_movie)
+            else:
+                st.error("Update failed. Could not find movie title in the response.")
+                st.session_state.messages.append({"role": "assistant", "type": "error", "content": "Update failed. Could not find movie title in the response."})
+
+        elif "deleteMovie" in data and data.get("deleteMovie", {}).get("success"):
+            st.success("Movie deleted successfully!")
+            st.session_state.messages.append({"role": "assistant", "type": "delete_success", "content": "Movie deleted successfully!"})
+        else:
+            st.info("I've processed your request. Here's the raw response:")
+            st.json(result)
+            st.session_state.messages.append({"role": "assistant", "type": "info", "data": result})
+    else:
+        st.error("There was an issue processing your request.")
+        st.json(result)
+        st.session_state.messages.append({"role": "assistant", "type": "error", "content": f"There was an issue: {result}"})
+
+
+def stream_chatbot(prompt):
+    """Yields the events of a streamed chatbot response as they arrive."""
+    with http_session().post(BACKEND_STREAM_URL, json={"query": prompt}, stream=True) as response:
         response.raise_for_status()
-        result = response.json()
-        return result.get("data", {}).get("getMovie")
-    except Exception as e:
-        st.error(f"Failed to fetch full movie details: {e}")
-        return None
+        for line in response.iter_lines():
+            if line:
+                yield json.loads(line)
 
 
 # --- Session State Initialization ---
@@ -119,7 +200,7 @@ if "messages" not in st.session_state:
     st.session_state.messages = []
 
 # --- Display Chat History ---
-for message in st.session_state.messages:
+for i, message in enumerate(st.session_state.messages):
     with st.chat_message(message["role"]):
         if message["role"] == "user":
             st.markdown(message["content"])
@@ -127,8 +208,10 @@ for message in st.session_state.messages:
             # Check the message type and render the appropriate UI
             if message["type"] == "movie_list":
                 st.success("Here are the movies I found:")
-                for movie in message["data"]:
-                    display_movie_card_html(movie)
+                display_movie_list(message["data"], f"page-{i}")
+            elif message["type"] == "aggregate":
+                st.success("Here are the numbers:")
+                display_aggregate_table(message["data"])
             elif message["type"] == "movie_single":
                 st.success("Here is the movie you requested:")
                 display_movie_card_html(message["data"])
@@ -160,69 +243,39 @@ if prompt := st.chat_input("What would you like to do? (e.g., 'List all movies')
         message_placeholder.markdown("Thinking... 🤔")
         print("printing prompt",prompt)
         try:
-            # Call the backend API
-            response = requests.post(BACKEND_URL, json={"query": prompt})
-            response.raise_for_status()
-            
-            # Process the response
-            api_response = response.json()
-            result = api_response.get("result", {})
-            data = result.get("data")
-            
-            # Remove the thinking message now that we have a response
-            message_placeholder.empty()
-
-            # --- Card Display Logic and Session State Update ---
-            if data:
-                if "listMovies" in data and data["listMovies"]:
-                    st.success("Here are the movies I found:")
-                    for movie in data["listMovies"]:
-                        display_movie_card_html(movie)
-                    st.session_state.messages.append({"role": "assistant", "type": "movie_list", "data": data["listMovies"]})
-                elif "getMovie" in data and data["getMovie"]:
-                    st.success("Here is the movie you requested:")
-                    display_movie_card_html(data["getMovie"])
-                    st.session_state.messages.append({"role": "assistant", "type": "movie_single", "data": data["getMovie"]})
-                elif "createMovie" in data and data["createMovie"]:
-                    st.success("Movie created successfully! Details are below:")
-                    display_movie_card_html(data["createMovie"])
-                    st.session_state.messages.append({"role": "assistant", "type": "create_success", "data": data["createMovie"]})
-                elif "updateMovie" in data and data["updateMovie"]:
-                    updated_movie_title = data["updateMovie"].get("Title")
-                    if updated_movie_title:
-                        # Fetch the full, updated movie details from the database
-                        full_movie_data = fetch_full_movie_details(updated_movie_title)
-                        
-                        if full_movie_data:
-                            # Update the existing message or append a new one
-                            existing_message = find_and_update_movie_entry(full_movie_data)
-                            if existing_message:
-                                existing_message["type"] = "update_success"
-                                existing_message["data"] = full_movie_data
-                            else:
-                                st.session_state.messages.append({"role": "assistant", "type": "update_success", "data": full_movie_data})
-                            
-                            st.success("Movie updated successfully! Here are the new details:")
-                            display_movie_card_html(full_movie_data)
-                        else:
-                            st.error("Could not retrieve full movie details after update.")
-                            st.session_state.messages.append({"role": "assistant", "type": "error", "content": "Could not retrieve full movie details after update."})
-                    else:
-                        st.error("Update failed. Could not find movie title in the response.")
-                        st.session_state.messages.append({"role": "assistant", "type": "error", "content": "Update failed. Could not find movie title in the response."})
-                    
-                elif "deleteMovie" in data and data.get("deleteMovie", {}).get("success"):
-                    st.success("Movie deleted successfully!")
-                    st.session_state.messages.append({"role": "assistant", "type": "delete_success", "content": "Movie deleted successfully!"})
-                else:
-                    st.info("I've processed your request. Here's the raw response:")
-                    st.json(result)
-                    st.session_state.messages.append({"role": "assistant", "type": "info", "data": result})
-            else:
-                st.error("There was an issue processing your request.")
-                st.json(result)
-                st.session_state.messages.append({"role": "assistant", "type": "error", "content": f"There was an issue: {result}"})
-                
+            # Stream the backend's answer: the generated query first, then one event per movie.
+            # The first page of cards is drawn as the rows arrive.
+            movies = []
+            cards = None
+            llm_output = ""
+            with closing(stream_chatbot(prompt)) as events:
+                for event in events:
+                    if event["event"] == "token":
+                        llm_output += event["content"]
+                        message_placeholder.markdown(f"Writing the query... ✍️\n\n`{llm_output}`")
+                    elif event["event"] == "query":
+                        message_placeholder.markdown("Running the query... 🔎")
+                    elif event["event"] == "row":
+                        if not movies:
+                            message_placeholder.empty()
+                            st.success("Here are the movies I found:")
+                            cards = st.container()
+                        if len(movies) < PAGE_SIZE:
+                            with cards:
+                                display_movie_card_html(event["data"])
+                        movies.append(event["data"])
+                    elif event["event"] == "result":
+                        message_placeholder.empty()
+                        render_result(event["result"])
+                    elif event["event"] == "error":
+                        error_message = f"**Error:** {event['error']}"
+                        message_placeholder.error(error_message)
+                        st.session_state.messages.append({"role": "assistant", "type": "error", "content": error_message})
+
+            if movies:
+                movie_page(len(movies), f"page-{len(st.session_state.messages)}")
+                st.session_state.messages.append({"role": "assistant", "type": "movie_list", "data": movies})
+
         except requests.exceptions.RequestException as e:
             error_message = f"**Error:** Could not connect to the backend. Please ensure the Flask server is running. \n\nDetails: {e}"
             message_placeholder.error(error_message)
@@ -0,0 +1,48 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import bulk  # noqa: E402
+from bulk import RowParser  # noqa: E402
+
+
+def parse(body, chunk_size=7):
+    parser = RowParser("csv")
+    rows = []
+    for i in range(0, len(body), chunk_size):
+        rows += parser.feed(body[i:i + chunk_size])
+    return rows + parser.feed(b"", final=True)
+
+
+def test_crlf_multiline_quoted_field():
+    body = (b'Title,Description,Year\r\n'
+            b'"Heat","A crew of thieves.\r\nA detective.\r\n""Classic""",1995\r\n'
+            b'Up,Balloons,2009\r\n')
+    rows = parse(body)
+    assert [(number, movie) for number, _, movie, _ in rows] == [
+        (1, {"Title": "Heat", "Description": 'A crew of thieves.\nA detective.\n"Classic"', "Year": 1995}),
+        (2, {"Title": "Up", "Description": "Balloons", "Year": 2009}),
+    ]
+
+
+def test_stray_quote_reports_its_row_and_parses_the_rest():
+    body = (b'Title,Description,Year\n'
+            b'Heat,"A crew of thieves,1995\n'
+            b'Up,Balloons,2009\n'
+            b'Cars,Racing,2006\n')
+    rows = parse(body)
+    assert [(number, title, error) for number, title, _, error in rows] == [
+        (1, None, "unterminated quoted field starting on line 2"),
+        (2, "Up", None),
+        (3, "Cars", None),
+    ]
+
+
+def test_stray_quote_is_given_up_after_max_record_lines():
+    lines = [b"Title,Year", b'"Heat,1995'] + [b"Movie %d,2000" % i for i in range(bulk.MAX_RECORD_LINES + 5)]
+    parser = RowParser("csv")
+    rows = parser.feed(b"\n".join(lines) + b"\n")
+    # Reported before the upload ends, and every later row is parsed on its own
+    assert rows[0][3] == "unterminated quoted field starting on line 2"
+    assert [title for _, title, _, _ in rows[1:]] == ["Movie %d" % i for i in range(bulk.MAX_RECORD_LINES + 5)]